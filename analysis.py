@@ -0,0 +1,222 @@
+import argparse
+import json
+import numpy as np
+import bitboard
+import history
+import qtable
+import symmetry
+from policy import MASK_MOVES
+
+# -----------------------------
+# POSITION ANALYSIS
+# -----------------------------
+# Analysing many positions at once: best moves and Q values of every strategy for a whole
+# batch of boards, without playing them one by one through trained_move. A Q-table is turned
+# once into dense arrays indexed by the base-3 state id (19683 x 9 Q values + known flags),
+# so a batch is one fancy-indexing lookup and a few NumPy operations. Used by the server's
+# POST /api/analyze, for offline analysis of recorded games (game_positions) and for diffing
+# two versions of a Q-table over every reachable position:
+#   python analysis.py q_table_A_best.pkl q_table_A_replay.pkl attack
+
+# same lookup arrays as batch_training, built here so the server does not import the training code
+TERNARY = np.array(bitboard.TERNARY, dtype=np.int64)
+IS_WIN = np.array([line is not None for line in bitboard.WINNING_LINE])
+CELL_BITS = 1 << np.arange(9)
+DIGITS = 3 ** np.arange(9)
+NO_MOVE = -1
+
+
+def q_arrays(Q_table):
+    """
+        Q values of every state as arrays, for any Q-table (dict, canonical or dense).
+
+        Returns:
+            tuple: (values (19683, 9) float array, known (19683,) bool array), 0 for unknown states.
+        """
+    values = np.zeros((bitboard.NUM_STATES, 9))
+    known = np.zeros(bitboard.NUM_STATES, dtype=bool)
+    if isinstance(Q_table, qtable.DenseQTable) and not Q_table.canonical:
+        known = Q_table.index != qtable.MISSING
+        values[known] = Q_table.values[Q_table.index[known]]
+        return values, known
+    items = symmetry.expand(Q_table) if symmetry.is_canonical(Q_table) else Q_table.items()
+    for state, q_values in items:
+        sid = bitboard.state_id(*bitboard.from_key(state))
+        values[sid] = np.asarray(q_values, dtype=float).reshape(9)
+        known[sid] = True
+    return values, known
+
+
+def parse_positions(positions):
+    """
+        Positions as 9-character strings ('X-O------', cells row by row, '-' empty) or 3x3 lists of
+        'X'/'O'/None converted to (x_masks, o_masks) arrays. Invalid positions raise ValueError.
+        """
+    keys = []
+    for i, position in enumerate(positions):
+        if isinstance(position, list):
+            if len(position) != 3 or any(not isinstance(row, list) or len(row) != 3 for row in position):
+                raise ValueError(f"Position {i} is not a 3x3 board")
+            position = ''.join('-' if cell is None else str(cell) for row in position for cell in row)
+        if not isinstance(position, str) or len(position) != 9 or set(position) - set('XO-'):
+            raise ValueError(f"Position {i} must be 9 characters of X, O and -")
+        keys.append(position)
+
+    cells = np.frombuffer(''.join(keys).encode('ascii'), dtype=np.uint8).reshape(-1, 9)
+    is_x, is_o = cells == ord('X'), cells == ord('O')
+    x_count, o_count = is_x.sum(axis=1), is_o.sum(axis=1)
+    illegal = np.flatnonzero((x_count != o_count) & (x_count != o_count + 1))
+    if len(illegal):
+        raise ValueError(f"Position {illegal[0]} is not legal, X moves first and players alternate")
+    return is_x.astype(np.int64) @ CELL_BITS, is_o.astype(np.int64) @ CELL_BITS
+
+
+def from_state_ids(sids):
+    """Vectorized bitboard.from_state_id: (x_masks, o_masks) arrays."""
+    digits = np.asarray(sids, dtype=np.int64)[:, None] // DIGITS % 3
+    return (digits == 1).astype(np.int64) @ CELL_BITS, (digits == 2).astype(np.int64) @ CELL_BITS
+
+
+def game_positions(record):
+    """(x_masks, o_masks, cells) of the positions before every move of a recorded game and the moves made."""
+    x_mask = o_mask = 0
+    x_masks, o_masks, cells = [], [], history.move_cells(record.get("moves", ()))
+    for i, cell in enumerate(cells):
+        x_masks.append(x_mask)
+        o_masks.append(o_mask)
+        if i % 2 == 0:
+            x_mask |= 1 << cell
+        else:
+            o_mask |= 1 << cell
+    return np.array(x_masks, dtype=np.int64), np.array(o_masks, dtype=np.int64), np.array(cells, dtype=np.int64)
+
+
+def analyze(x_masks, o_masks, tables):
+    """
+        Analysing a batch of positions with every table.
+
+        Args:
+            x_masks, o_masks (np.array): positions as bitboards.
+            tables (dict): strategy -> output of q_arrays.
+
+        Returns:
+            dict: arrays over the positions: "sids", "x_to_move", "x_won", "o_won", "game_over" and for
+                  every strategy a dict of "q_values" (n, 9), "known", "best" (mask of the legal moves with
+                  the highest Q value, 0 if the state is unknown or the game is over) and "move" (the
+                  lowest-index best move, -1 if none; the AI breaks ties randomly unless AI_TIE_BREAK=first,
+                  so with several best moves it may play another one of them).
+        """
+    x_masks, o_masks = np.asarray(x_masks, dtype=np.int64), np.asarray(o_masks, dtype=np.int64)
+    occupied = x_masks | o_masks
+    x_won, o_won = IS_WIN[x_masks], IS_WIN[o_masks]
+    game_over = x_won | o_won | (occupied == bitboard.FULL_MASK)
+    result = {"sids": TERNARY[x_masks] + 2 * TERNARY[o_masks], "game_over": game_over, "x_won": x_won, "o_won": o_won,
+              "x_to_move": np.bitwise_count(x_masks) == np.bitwise_count(o_masks)}
+    legal = (occupied[:, None] & CELL_BITS) == 0
+
+    for strategy, (values, known) in tables.items():
+        q_values, in_table = values[result["sids"]], known[result["sids"]]
+        scored = np.where(legal, q_values, -np.inf)
+        has_best = in_table & ~game_over
+        best = np.where(has_best[:, None], scored == scored.max(axis=1, keepdims=True), False) & legal
+        result[strategy] = {"q_values": q_values, "known": in_table, "best": best @ CELL_BITS,
+                            "move": np.where(best.any(axis=1), best.argmax(axis=1), NO_MOVE)}
+    return result
+
+
+def analyze_positions(positions, tables):
+    """
+        analyze for positions given as strings or boards (see parse_positions), as JSON-ready dicts:
+        {"position", "to_move", "game_over", "winner", <strategy>: {"known", "move", "best_moves", "q_values"}}.
+        "move" is the lowest-index of "best_moves", the AI plays any of them (random tie break).
+        Unknown states have no move (the server would play a random one) and no Q values.
+        """
+    x_masks, o_masks = parse_positions(positions)
+    result = analyze(x_masks, o_masks, tables)
+    columns = {name: result[name].tolist() for name in ("sids", "x_to_move", "game_over", "x_won", "o_won")}
+    strategies = {strategy: {name: result[strategy][name].tolist() for name in ("q_values", "known", "best", "move")}
+                  for strategy in tables}
+
+    analyzed = []
+    for i, sid in enumerate(columns["sids"]):
+        game_over = columns["game_over"][i]
+        record = {
+            "position": bitboard.STATE_KEYS[sid],
+            "to_move": None if game_over else 'X' if columns["x_to_move"][i] else 'O',
+            "game_over": game_over,
+            "winner": 'X' if columns["x_won"][i] else 'O' if columns["o_won"][i] else 'draw' if game_over else None,
+        }
+        for strategy, arrays in strategies.items():
+            known, move = arrays["known"][i], arrays["move"][i]
+            record[strategy] = {
+                "known": known,
+                "move": None if move == NO_MOVE else [move // 3, move % 3],
+                "best_moves": MASK_MOVES[arrays["best"][i]],
+                "q_values": [arrays["q_values"][i][row * 3:row * 3 + 3] for row in range(3)] if known else None,
+            }
+        analyzed.append(record)
+    return analyzed
+
+
+# -----------------------------
+# DIFF OF TWO Q-TABLE VERSIONS
+# -----------------------------
+def diff_tables(old, new, purpose, solution=None, limit=20):
+    """
+        Comparing the best moves of two versions of a Q-table in every reachable, unfinished position
+        where the agent moves (X for attack, O for defence), checked against perfect play.
+
+        Returns:
+            dict: "positions", "known_old", "known_new", "changed" (positions with other best moves),
+                  "max_q_change", "mean_q_change" (over positions known to both), "optimal_old",
+                  "optimal_new" (positions where all best moves keep the game-theoretic result)
+                  and the first limit "changes" ({"position", "old", "new", "optimal"}).
+        """
+    if purpose not in ('attack', 'defence'):
+        raise ValueError(f"Unknown purpose: {purpose}")
+    import solver
+    solution = solution or solver.solve()
+    sids = np.flatnonzero(solution.reachable & (solution.best != 0))
+    x_masks, o_masks = from_state_ids(sids)
+    mover = np.bitwise_count(x_masks) == np.bitwise_count(o_masks)
+    if purpose == 'defence':
+        mover = ~mover
+    sids, x_masks, o_masks = sids[mover], x_masks[mover], o_masks[mover]
+
+    result = analyze(x_masks, o_masks, {"old": q_arrays(old), "new": q_arrays(new)})
+    old_best, new_best = result["old"]["best"], result["new"]["best"]
+    optimal = solution.optimal[sids].astype(np.int64)
+    both = result["old"]["known"] & result["new"]["known"]
+    q_change = np.abs(result["new"]["q_values"] - result["old"]["q_values"])[both]
+    changed = np.flatnonzero(old_best != new_best)
+
+    def optimal_count(best):
+        return int(np.count_nonzero((best != 0) & (best & ~optimal == 0)))
+
+    return {
+        "positions": len(sids),
+        "known_old": int(result["old"]["known"].sum()),
+        "known_new": int(result["new"]["known"].sum()),
+        "changed": len(changed),
+        "max_q_change": float(q_change.max()) if q_change.size else 0.0,
+        "mean_q_change": float(q_change.mean()) if q_change.size else 0.0,
+        "optimal_old": optimal_count(old_best),
+        "optimal_new": optimal_count(new_best),
+        "changes": [{"position": bitboard.STATE_KEYS[sids[i]], "old": MASK_MOVES[old_best[i]],
+                     "new": MASK_MOVES[new_best[i]], "optimal": MASK_MOVES[optimal[i]]} for i in changed[:limit]],
+    }
+
+
+if __name__ == "__main__":
+    from inference import load_model
+    parser = argparse.ArgumentParser(description="Diff of the best moves of two Q-table versions in every reachable position.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("purpose", choices=("attack", "defence"))
+    parser.add_argument("--limit", type=int, default=20, help="number of changed positions listed")
+    args = parser.parse_args()
+
+    tables = [load_model(filename) for filename in (args.old, args.new)]
+    if None in tables:
+        raise SystemExit("Both Q-tables are needed")
+    print(json.dumps(diff_tables(*tables, args.purpose, limit=args.limit), indent=2))
@@ -1,18 +1,65 @@
-from flask import Flask, request, jsonify, session
-from flask import render_template
-import json, os
-from model import trained_move, load_model
+from flask import Flask, request, jsonify, session, g
+from flask import render_template, Response, stream_with_context
+import json, os, time
+import analysis
+import registry
+import solver
 from game import Game
+import history as history_store
+import sessions
+import instrumentation
 import uuid
 
 app = Flask(__name__)
 app.secret_key = 'BAD_SECRET_KEY'
 
-games = {}  # Main server dictionary with game state keys and values,
-            # dictionary: key = session_id, value = Game object
+games = sessions.create_store()     # Main server store of games: key = session_id, value = Game object,
+                                    # bounded (LRU + idle TTL), configured with SESSION_* environment variables
 
-Q_ATTACK = load_model("q_table_A_best.pkl")      # loading Q_table to offensive strategy
-Q_DEFENCE = load_model("q_table_D_best.pkl")     # loading Q_table to defensive strategy
+# best moves of every state precompiled from Q_tables, AI_TIE_BREAK=first makes the AI deterministic
+AI_TIE_BREAK = os.environ.get("AI_TIE_BREAK", "random")
+AI_SEED = int(os.environ["AI_SEED"]) if os.environ.get("AI_SEED") else None
+
+# served models, reloaded without restarting on SIGHUP, POST /api/models/reload or (MODEL_WATCH_INTERVAL) file changes
+MODELS = registry.ModelRegistry(AI_TIE_BREAK, AI_SEED)
+MODELS.register("attack", os.environ.get("MODEL_ATTACK", "q_table_A_best.pkl"))      # Q_table of offensive strategy
+MODELS.register("defence", os.environ.get("MODEL_DEFENCE", "q_table_D_best.pkl"))    # Q_table of defensive strategy
+# perfect play, solved at startup (0.1 s) or loaded from perfect.policy.npy
+MODELS.register("perfect", ai_policy=solver.perfect_policy(AI_TIE_BREAK, AI_SEED), version="solver")
+MODELS.reload_on_signal()
+if float(os.environ.get("MODEL_WATCH_INTERVAL", "0")) > 0:
+    MODELS.watch(float(os.environ["MODEL_WATCH_INTERVAL"]))
+STRATEGIES = ("attack", "defence", "perfect")
+
+# -----------------------------
+# METRICS (/metrics, see instrumentation.py)
+# -----------------------------
+if instrumentation.enabled:
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        instrumentation.REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route, request.method, response.status_code)
+        return response
+
+    instrumentation.Gauge('tictactoe_sessions', 'Games kept in the session store.', lambda: len(games))
+    instrumentation.Gauge('tictactoe_sessions_evicted_total', 'Games evicted because the session store was full.',
+                          lambda: games.evictions, kind='counter')
+    instrumentation.Gauge('tictactoe_sessions_expired_total', 'Games removed after being idle too long.',
+                          lambda: games.expirations, kind='counter')
+    instrumentation.Gauge('tictactoe_history_queue_depth', 'Finished games waiting for the background history writer.',
+                          lambda: history_store.get_writer().stats().get('queue_depth'))
+    instrumentation.Gauge('tictactoe_history_dropped_total', 'Finished games dropped because the history queue was full.',
+                          lambda: history_store.get_writer().stats().get('dropped'), kind='counter')
+
+@app.route('/metrics')
+def metrics():
+    if not instrumentation.enabled:
+        return jsonify({"error": "Metrics are disabled (METRICS_ENABLED=0)"}), 404
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
 
 def generate_unique_id():
     return str(uuid.uuid4()) # generates a random unique UUID version 4
@@ -25,71 +72,103 @@ def index():
 def start_game():
     session_id = generate_unique_id()   # function for generating ID (e.g. uuid4)
     session['session_id'] = session_id
-    games[session_id] = Game()          # create a new board for the user and storing Game object in dictionary
+    games.save(session_id, Game())      # create a new board for the user and storing Game object in the store
     return jsonify({"status": "a unique board was created for the user"})
 
+def session_game():
+    """Game of the current session or None if there is no session or the game has expired."""
+    session_id = session.get('session_id')
+    return games.get(session_id) if session_id else None
+
+NO_GAME_ERROR = "No session or the game has expired, start a new game!"
+
 @app.route('/change-strategy', methods = ['POST'])
 def change_strategy():
-    # Get unique game ID for this session
-    session_id = session.get('session_id')
-    if not session_id:
-        return jsonify({"error": "No session!"}), 400
+    # assigning an instance of a game object of this session to the game variable
+    game = session_game()
+    if game is None:
+        return jsonify({"error": NO_GAME_ERROR}), 400
 
     # storing the strategy from the frontend
     data = request.get_json()
     strategy = data["strategy"]
+    if strategy not in STRATEGIES:
+        return jsonify({"error": "Unknown strategy"}), 400
 
-    # assigning an instance of a game object to the game variable and changing the strategy value for a given instance
-    game = games[session_id]
+    # changing the strategy value for a given instance
     game.strategy = strategy
+    games.save(session['session_id'], game)
 
     return jsonify({"status": "Strategy updated"}), 200
 
-@app.route('/history')
-def history():
-    filename = 'games_history.json'
-    games_history = []
+HISTORY_PER_PAGE = 20
+HISTORY_MAX_PER_PAGE = 100
 
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            try:
-                games_history = json.load(f)
-            except json.JSONDecodeError:
-                games_history = []
+def history_filters():
+    # filters shared by all history endpoints: ?result=X|O|DRAW&strategy=attack|defence&since=2025-01-01&until=...
+    args = request.args
+    return {
+        "result": args.get("result") or None,
+        "strategy": args.get("strategy") or None,
+        "since": history_store.parse_time(args.get("since")),
+        "until": history_store.parse_time(args.get("until")),
+    }
 
-    return render_template('history.html', games_history = games_history)
+def history_page():
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", HISTORY_PER_PAGE, type=int), 1), HISTORY_MAX_PER_PAGE)
+    total, games_history = history_store.get_writer().query(**history_filters(), offset=(page - 1) * per_page, limit=per_page)
+    games_history = [history_store.compact_record(record) for record in games_history]  # old records have board snapshots
+    pages = max((total + per_page - 1) // per_page, 1)
+    return {"games": games_history, "total": total, "page": page, "per_page": per_page, "pages": pages}
 
-@app.route('/AI-move', methods = ['POST'])
-def ai_move():
-    # Get unique game ID for this session
-    session_id = session.get('session_id')
-    if not session_id:
-        return jsonify({"error": "No session!"}), 400
-
-    # assigning an instance of a game object to the game variable
-    game = games[session_id]
-
-    # assigning proper Q_table based on chosen strategy
-    if game.strategy == "attack":
-        Q_table = Q_ATTACK
-    elif game.strategy == "defence":
-        Q_table = Q_DEFENCE
-    else:
-        return jsonify({"error": "Unknown strategy"}), 400
+@app.template_filter('replay')
+def replay_filter(moves):
+    # boards after every move are rebuilt only for the rendered history page
+    return history_store.replay_moves(moves)
 
-    board = game.board                      # storing current board to variable
-    move = trained_move(board, Q_table)     # AI agent choosing the best possible move
+@app.route('/history')
+def history():
+    try:
+        data = history_page()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    filters = {key: value for key, value in request.args.items() if key != "page"}
+    return render_template('history.html', games_history = data["games"], history = data, filters = filters)
 
-    row, col = move                 # storing move to row and col variables
+@app.route('/api/history')
+def history_api():
+    try:
+        return jsonify(history_page())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+@app.route('/api/history/export')
+def history_export():
+    # streaming all matching games as JSON Lines, one game is in memory at a time
     try:
-        game.make_move(row, col)    # make move is main game class method that involves checking if square(represented as row, col) is taken by any player,
-                                    # saving done move to game's board, manages game value properties to represent state of game through values as:
-                                    # (game_over, winner, winning_line, current_player)
+        filters = history_filters()
     except ValueError as e:
-        # Return error statement
         return jsonify({"error": str(e)}), 400
 
+    def generate():
+        for record in history_store.get_writer().export(**filters):
+            yield json.dumps(history_store.compact_record(record), separators=(',', ':')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={"Content-Disposition": "attachment; filename=games_history.jsonl"})
+
+@app.route('/api/history/stats')
+def history_stats():
+    # queue depth and write latency of the background history writer
+    return jsonify(history_store.get_writer().stats())
+
+def apply_move(game, row, col):
+    """Making a move for the current player and returning the outcome sent to the frontend (ValueError for wrong moves)."""
+    game.make_move(row, col)    # make move is main game class method that involves checking if square(represented as row, col) is taken by any player,
+                                # saving done move to game's board, manages game value properties to represent state of game through values as:
+                                # (game_over, winner, winning_line, current_player)
+
     winner = game.winner                # default = None, changing to current_player in case of victory
     winning_line = game.winning_line    # default = None, coordinates of winning line
     draw = False                        # a flag indicating a tie
@@ -97,22 +176,95 @@ def ai_move():
     current_player = game.current_player    # storing current_player, this is player that just moved
     if game.check_full_board():             # checking is game draw/over or has to be continued
         draw = True
-    if game.game_over:
+    game_over = game.game_over
+    if game_over:
         game.reset_game()
     else:
         game.switch_player()    # method switching current_player from X to O and from O to X, switched player is the next player's move
                                 # WARNING: has to be executed after storing current_player from game class
 
-    return jsonify({"status": "AI moved", "current_player": current_player, "winner": winner, "winning_line": winning_line, "draw": draw, "aiRow": row, "aiCol": col})
+    return {"current_player": current_player, "winner": winner, "winning_line": winning_line, "draw": draw, "game_over": game_over}
+
+def choose_ai_move(game):
+    """Returning the AI move ((row, col)) and the version of the model that chose it."""
+    if game.strategy not in STRATEGIES:
+        raise ValueError("Unknown strategy")
+    # the model is taken once, so the whole move is made by one version even if a reload swaps it meanwhile
+    model = MODELS.get(game.strategy)
+    if model is None:
+        raise ValueError(f"Model of strategy {game.strategy} is not available")
+    ai_policy = model.policy
+
+    if not instrumentation.enabled:
+        return ai_policy.move(game.x_mask, game.o_mask), model.version     # AI agent choosing the best possible move
+
+    start = time.perf_counter()
+    move = ai_policy.move(game.x_mask, game.o_mask)
+    instrumentation.AI_MOVE_SECONDS.observe(time.perf_counter() - start, game.strategy)
+    # unknown state = the Q-table has no answer and a random move is made
+    instrumentation.QTABLE_LOOKUPS.inc(game.strategy, model.version,
+                                       "hit" if ai_policy.knows(game.x_mask, game.o_mask) else "miss")
+    return move, model.version
+
+@app.route('/api/models')
+def models_info():
+    return jsonify(MODELS.describe())
+
+@app.route('/api/models/reload', methods = ['POST'])
+def models_reload():
+    # new tables are loaded, validated and compiled in the background, then swapped in
+    MODELS.reload_async()
+    return jsonify({"status": "Reloading models"}), 202
+
+# positions accepted by one /api/analyze request
+ANALYZE_MAX_POSITIONS = int(os.environ.get("ANALYZE_MAX_POSITIONS", "10000"))
+
+@app.route('/api/analyze', methods = ['POST'])
+def analyze_positions():
+    # stateless analysis of many positions in one request: {"positions": ["X-O------", ...], "strategies": [...]}
+    # returns best moves and Q values of every strategy with a Q-table (attack and defence by default)
+    data = request.get_json(silent=True) or {}
+    positions = data.get("positions")
+    try:
+        if not isinstance(positions, list):
+            raise ValueError("positions must be a list of boards")
+        if len(positions) > ANALYZE_MAX_POSITIONS:
+            raise ValueError(f"At most {ANALYZE_MAX_POSITIONS} positions can be analysed at once")
+        models = {}
+        for strategy in data.get("strategies", ["attack", "defence"]):
+            model = MODELS.get(strategy) if strategy in STRATEGIES else None
+            if model is None or model.Q_table is None:
+                raise ValueError(f"Strategy {strategy} has no Q-table to analyse")
+            models[strategy] = model    # taken once, a reload meanwhile does not mix versions
+        results = analysis.analyze_positions(positions, {strategy: model.q_arrays() for strategy, model in models.items()})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results, "model_versions": {strategy: model.version for strategy, model in models.items()}})
+
+@app.route('/AI-move', methods = ['POST'])
+def ai_move():
+    # assigning an instance of a game object of this session to the game variable
+    game = session_game()
+    if game is None:
+        return jsonify({"error": NO_GAME_ERROR}), 400
+
+    try:
+        (row, col), model_version = choose_ai_move(game)    # storing move to row and col variables
+        outcome = apply_move(game, row, col)
+    except ValueError as e:
+        # Return error statement
+        return jsonify({"error": str(e)}), 400
+    games.save(session['session_id'], game)
+
+    outcome.pop("game_over")
+    return jsonify({"status": "AI moved", **outcome, "aiRow": row, "aiCol": col, "modelVersion": model_version})
 
 @app.route('/player-move', methods = ['POST'])
 def player_move():
-    session_id = session.get('session_id')
-    if not session_id:
-        return jsonify({"error": "No session!"}), 400
-
-    # assigning an instance of a game object to the game variable
-    game = games[session_id]
+    # assigning an instance of a game object of this session to the game variable
+    game = session_game()
+    if game is None:
+        return jsonify({"error": NO_GAME_ERROR}), 400
 
     # data preparation to game's make_move function, row and col are stored from json frontend
     data = request.get_json()
@@ -120,27 +272,49 @@ def player_move():
     col = data["col"]
 
     try:
-        game.make_move(row, col)    # make move is main game class method that involves checking if square(represented as row, col) is taken by any player,
-                                    # saving done move to game's board, manages game value properties to represent state of game through values as:
-                                    # (game_over, winner, winning_line, current_player)
+        outcome = apply_move(game, row, col)
     except ValueError as e:
         # Return error statement
         return jsonify({"error": str(e)}), 400
+    games.save(session['session_id'], game)
 
-    winner = game.winner                # default = None, changing to current_player in case of victory
-    winning_line = game.winning_line    # default = None, coordinates of winning line
-    draw = False                        # a flag indicating a tie
+    outcome.pop("game_over")
+    return jsonify({"status": "Player moved", **outcome})
 
-    current_player = game.current_player    # storing current_player, this is player that just moved
-    if game.check_full_board():             # checking is game draw/over or has to be continued
-        draw = True
-    if game.game_over:
-        game.reset_game()
-    else:
-        game.switch_player()    # method switching current_player from X to O and from O to X, switched player is the next player's move
-                                # WARNING: has to be executed after storing current_player from game class
+@app.route('/player-and-ai-move', methods = ['POST'])
+def player_and_ai_move():
+    # player's move and, if the game goes on, AI's answer in one request (one round trip per turn)
+    game = session_game()
+    if game is None:
+        return jsonify({"error": NO_GAME_ERROR}), 400
+
+    data = request.get_json()
+    row = data["row"]
+    col = data["col"]
+
+    try:
+        player_outcome = apply_move(game, row, col)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ai_outcome = None
+    if not player_outcome.pop("game_over"):
+        try:
+            (ai_row, ai_col), model_version = choose_ai_move(game)
+            ai_outcome = apply_move(game, ai_row, ai_col)
+        except ValueError as e:
+            games.save(session['session_id'], game)     # player's move stays
+            return jsonify({"error": str(e), "player": player_outcome}), 400
+        ai_outcome.pop("game_over")
+        ai_outcome.update({"aiRow": ai_row, "aiCol": ai_col, "modelVersion": model_version})
+    games.save(session['session_id'], game)
+
+    return jsonify({"status": "Player and AI moved" if ai_outcome else "Player moved", "player": player_outcome, "ai": ai_outcome})
 
-    return jsonify({"status": "Player moved", "current_player": current_player, "winner": winner, "winning_line": winning_line, "draw": draw})
+@app.route('/api/sessions')
+def sessions_stats():
+    # number of stored games and how many were evicted (store full) or expired (idle too long)
+    return jsonify(games.stats())
 
 if __name__ == "__main__":
     app.run()
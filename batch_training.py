@@ -0,0 +1,203 @@
+import numpy as np
+import bitboard
+import qtable
+import symmetry
+
+# -----------------------------
+# BATCHED SELF-PLAY TRAINING
+# -----------------------------
+# Thousands of training games are played in lockstep: at every ply all running games
+# make their move at once, so choosing actions, checking wins and updating Q values are
+# NumPy operations over the whole batch. Q-tables are dense arrays (19683 states x 9 moves)
+# indexed by the base-3 state id, rewards are the same as in model.train_agents:
+#   X: +1 win, -1 loss, 0 draw, -0.5 for every move that does not end the game
+#   O: +1 win, -1 loss, +1 draw, 0 for every move that does not end the game
+# With n_step set, a player's moves are not updated one at a time but at the end of the game
+# towards n-step returns over the player's own moves: the rewards of its next n moves plus the
+# discounted best Q value of the position where it moves n moves later (no bootstrap when the
+# game ends before that). The terminal reward then reaches the first moves in one game instead
+# of creeping back one move per update.
+
+TERNARY = np.array(bitboard.TERNARY, dtype=np.int64)
+IS_WIN = np.array([line is not None for line in bitboard.WINNING_LINE])
+CELL_INDEX = np.arange(9)
+PLAYERS = ('X', 'O')
+ONGOING_REWARD = {'X': -0.5, 'O': 0.0}
+
+
+class BatchTrainer:
+    """
+        Batched Q-learning of both agents.
+
+        Args:
+            learning_rate (float), discount_factor (float): Q-learning parameters.
+            batch_size (int): number of games played in lockstep.
+            seed (int): seed of the NumPy random generator.
+            n_step (int): length of n-step returns, None = one-step Q-learning after every move.
+        """
+    def __init__(self, learning_rate, discount_factor, batch_size=4096, seed=None, n_step=None):
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.n_step = n_step
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        self.Q = {player: np.zeros((bitboard.NUM_STATES, 9)) for player in PLAYERS}
+        # known = state has been updated at least once (is "in the Q-table")
+        self.known = {player: np.zeros(bitboard.NUM_STATES, dtype=bool) for player in PLAYERS}
+
+    def train(self, first_episode, last_episode, epsilon_min, epsilon_max, decay_rate):
+        """Playing episodes first_episode ... last_episode - 1 with the usual exponential epsilon schedule."""
+        for start in range(first_episode, last_episode, self.batch_size):
+            episodes = np.arange(start, min(start + self.batch_size, last_episode))
+            exploration_rates = epsilon_min + (epsilon_max - epsilon_min) * np.exp(-decay_rate * episodes)
+            self._play_batch(exploration_rates)
+
+    def _choose_actions(self, player, sids, occupied, exploration_rates):
+        n = len(sids)
+        legal = (occupied[:, None] >> CELL_INDEX) & 1 == 0
+        # greedy only if not exploring and the state is known, like choose_action
+        greedy = (self.rng.random(n) >= exploration_rates) & self.known[player][sids]
+
+        q_values = np.where(legal, self.Q[player][sids], -np.inf)
+        best = q_values == q_values.max(axis=1, keepdims=True)
+        candidates = np.where(greedy[:, None], best, legal)
+
+        # uniform choice among candidates: the candidate with the highest random key
+        keys = np.where(candidates, self.rng.random((n, 9)), -1.0)
+        return keys.argmax(axis=1)
+
+    def update(self, player, sids, actions, next_sids, rewards, counts=None, discounts=None):
+        """
+            One Q-learning step for a batch of transitions (arrays of state ids, actions 0-8, next
+            state ids and rewards). counts: how many times every transition happened (default 1).
+            discounts: factor of the best next Q value of every transition (default discount_factor).
+            """
+        if len(sids) == 0:
+            return
+        Q = self.Q[player]
+        discounts = self.discount_factor if discounts is None else discounts
+        targets = rewards + discounts * Q[next_sids].max(axis=1)
+        weights = np.ones(len(sids)) if counts is None else np.asarray(counts, dtype=float)
+
+        # k updates of the same (state, action) in one step are merged into the result of
+        # k sequential updates towards their mean target, so large batches stay stable
+        pairs, inverse = np.unique(sids * 9 + actions, return_inverse=True)
+        counts = np.bincount(inverse, weights=weights)
+        mean_targets = np.bincount(inverse, weights=targets * weights) / counts
+        pair_sids, pair_actions = np.divmod(pairs, 9)
+        decay = (1 - self.learning_rate) ** counts
+        Q[pair_sids, pair_actions] = mean_targets + decay * (Q[pair_sids, pair_actions] - mean_targets)
+        self.known[player][pair_sids] = True
+
+    def _play_batch(self, exploration_rates):
+        n = len(exploration_rates)
+        masks = {'X': np.zeros(n, dtype=np.int64), 'O': np.zeros(n, dtype=np.int64)}
+        last_moves = {player: (np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64))
+                      for player in PLAYERS}
+        running = np.arange(n)
+        if self.n_step:
+            # moves of every player in every game, rewards are filled in when the game ends
+            trajectories = {player: (np.zeros((n, 5), dtype=np.int64), np.zeros((n, 5), dtype=np.int64),
+                                     np.zeros(n, dtype=np.int64), np.zeros(n)) for player in PLAYERS}
+
+        for ply in range(9):
+            if len(running) == 0:
+                break
+            player = PLAYERS[ply % 2]
+            x_masks, o_masks = masks['X'][running], masks['O'][running]
+            sids = TERNARY[x_masks] + 2 * TERNARY[o_masks]
+            actions = self._choose_actions(player, sids, x_masks | o_masks, exploration_rates[running])
+
+            mover_masks = masks[player][running] | (1 << actions)
+            masks[player][running] = mover_masks
+            next_sids = sids + (1 if player == 'X' else 2) * 3 ** actions
+
+            won = IS_WIN[mover_masks]
+            over = won | ((masks['X'][running] | masks['O'][running]) == bitboard.FULL_MASK)
+
+            if self.n_step:
+                trajectory_sids, trajectory_actions, lengths, terminal_rewards = trajectories[player]
+                trajectory_sids[running, ply // 2], trajectory_actions[running, ply // 2] = sids, actions
+                lengths[running] += 1
+                ended, mover_won = running[over], won[over]
+                for agent in PLAYERS:
+                    draw_reward = 0.0 if agent == 'X' else 1.0
+                    win_reward = 1.0 if agent == player else -1.0
+                    trajectories[agent][3][ended] = np.where(mover_won, win_reward, draw_reward)
+                running = running[~over]
+                continue
+
+            states, moves, next_states = last_moves[player]
+            states[running], moves[running], next_states[running] = sids, actions, next_sids
+
+            # ongoing reward for the player who just moved
+            ongoing = ~over
+            self.update(player, sids[ongoing], actions[ongoing], next_sids[ongoing],
+                         np.full(np.count_nonzero(ongoing), ONGOING_REWARD[player]))
+
+            # final rewards for the last moves of both players
+            ended = running[over]
+            if len(ended):
+                mover_won = won[over]
+                for agent in PLAYERS:
+                    if agent == player:
+                        rewards = np.where(mover_won, 1.0, 0.0 if agent == 'X' else 1.0)
+                    else:
+                        rewards = np.where(mover_won, -1.0, 0.0 if agent == 'X' else 1.0)
+                    states, moves, next_states = last_moves[agent]
+                    self.update(agent, states[ended], moves[ended], next_states[ended], rewards)
+
+            running = running[ongoing]
+
+        if self.n_step:
+            for player in PLAYERS:
+                self._update_n_step(player, *trajectories[player])
+
+    def _update_n_step(self, player, sids, actions, lengths, terminal_rewards):
+        # rewards of every move: ongoing reward, terminal reward for the last one, 0 after the game (padded by n)
+        moves = np.arange(5)
+        rewards = np.where(moves < lengths[:, None] - 1, ONGOING_REWARD[player], 0.0)
+        rewards[np.arange(len(lengths)), np.maximum(lengths - 1, 0)] = terminal_rewards
+        rewards = np.where(moves < lengths[:, None], rewards, 0.0)
+        padded = np.pad(rewards, ((0, 0), (0, self.n_step)))
+
+        weights = self.discount_factor ** np.arange(self.n_step)
+        returns = np.stack([padded[:, k:k + self.n_step] @ weights for k in moves], axis=1)
+        # bootstrap from the player's own position n moves later, if the game has not ended by then
+        later = moves + self.n_step
+        bootstrap = later[None, :] < lengths[:, None]
+        next_sids = np.where(bootstrap, sids[:, np.minimum(later, 4)], 0)
+        discounts = np.where(bootstrap, self.discount_factor ** self.n_step, 0.0)
+
+        played = moves[None, :] < lengths[:, None]
+        self.update(player, sids[played], actions[played], next_sids[played], returns[played],
+                    discounts=discounts[played])
+
+    def view(self, player):
+        """Current Q-table of the player as qtable.DenseQTable (without copying Q values), e.g. for simulate_games."""
+        index = np.where(self.known[player], np.arange(bitboard.NUM_STATES), qtable.MISSING).astype(np.int16)
+        return qtable.DenseQTable(self.Q[player], index)
+
+    def load(self, player, Q_table):
+        """Starting from an existing Q-table (dict, canonical or dense) instead of zeros."""
+        items = symmetry.expand(Q_table) if symmetry.is_canonical(Q_table) else Q_table.items()
+        for state, q_values in items:
+            sid = bitboard.state_id(*bitboard.from_key(state))
+            self.Q[player][sid] = np.asarray(q_values, dtype=float).reshape(9)
+            self.known[player][sid] = True
+
+    def get_state(self):
+        """Q-tables and random generator state, for training checkpoints (see training_checkpoint.py)."""
+        return {"Q": {player: Q.copy() for player, Q in self.Q.items()},
+                "known": {player: known.copy() for player, known in self.known.items()},
+                "rng": self.rng.bit_generator.state}
+
+    def set_state(self, state):
+        self.Q = {player: np.array(Q) for player, Q in state["Q"].items()}
+        self.known = {player: np.array(known) for player, known in state["known"].items()}
+        self.rng.bit_generator.state = state["rng"]
+
+    def to_dict(self, player):
+        """Q-table of the player in the dict format used by save_model/load_model."""
+        return {bitboard.STATE_KEYS[sid]: self.Q[player][sid].reshape(3, 3).copy()
+                for sid in np.flatnonzero(self.known[player])}
@@ -0,0 +1,275 @@
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+try:
+    import resource     # peak memory of the process, not available on Windows
+except ImportError:
+    resource = None
+
+# -----------------------------
+# SERVER LOAD BENCHMARK
+# -----------------------------
+# Simulated players play full PvE games (/start-game, /change-strategy, /AI-move,
+# /player-and-ai-move or /player-move) and now and then open /history, all at the same time.
+# The AI plays the side its Q-table was trained for: with "attack" it opens the game as X
+# (/AI-move), with "defence" the player opens and the AI answers as O, so every AI move is a
+# Q-table lookup. A turn is one request (/player-and-ai-move) or two (/player-move, then
+# /AI-move, like the frontend without the combined endpoint); with --turns both (default)
+# players alternate the two from game to game, so both are reported side by side. After an
+# error response the player starts a new game (/start-game). Requests go either through the
+# Flask test client (in-process, no network) or through a real HTTP server on localhost.
+#   python benchmarks/bench_app.py --mode client --players 8 --games 50
+#   python benchmarks/bench_app.py --turns separate     # only two requests per turn
+#   python benchmarks/bench_app.py --mode http --players 32 --games 20
+#   python benchmarks/bench_app.py --save-baseline      # store the result as the baseline
+#   python benchmarks/bench_app.py --check              # exit 1 on regression vs the baseline
+# The history is written to a temporary file, so the real games_history.jsonl is not touched.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "app_baseline.json")
+ENDPOINTS = ("/start-game", "/change-strategy", "/AI-move", "/player-and-ai-move", "/player-move", "/history")
+TURNS = ("both", "combined", "separate")
+
+
+def load_app(history_file):
+    # has to be called before anything imports app.py, the history writer reads HISTORY_FILE once
+    os.environ["HISTORY_FILE"] = history_file
+    os.environ.setdefault("SESSION_BACKEND", "memory")
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)      # Q-tables are loaded from the working directory
+    import app
+    return app
+
+
+class TestClientPlayer:
+    """Player sending requests through the Flask test client (keeps its own session cookie)."""
+    def __init__(self, flask_app, base_url=None):
+        self.client = flask_app.test_client()
+
+    def get(self, path):
+        return self.client.get(path).get_json(silent=True)
+
+    def post(self, path, data):
+        return self.client.post(path, json=data).get_json(silent=True)
+
+
+class HttpPlayer:
+    """Player sending requests to a real HTTP server."""
+    def __init__(self, flask_app, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            body = e.read()
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None     # HTML page (/history)
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data):
+        return self._open(urllib.request.Request(self.base_url + path, data=json.dumps(data).encode(),
+                                                 headers={"Content-Type": "application/json"}, method="POST"))
+
+
+def failed(response):
+    return response is None or "error" in response
+
+
+def play_game(timed, player, rng, strategy, combined):
+    """Playing one game, False if a request failed before the game was over."""
+    response = timed("/change-strategy", player.post, {"strategy": strategy})
+    if failed(response):
+        return False
+    free = set(range(9))
+    if strategy == "attack":
+        # the attacking AI plays X and opens the game
+        response = timed("/AI-move", player.post, {})
+        if failed(response):
+            return False
+        free.discard(response["aiRow"] * 3 + response["aiCol"])
+    while True:
+        cell = rng.choice(sorted(free))
+        move = {"row": cell // 3, "col": cell % 3}
+        free.discard(cell)
+        if combined:
+            response = timed("/player-and-ai-move", player.post, move)
+            if failed(response):
+                return False
+            if response["ai"] is None:
+                return True     # the player's move ended the game
+            response = response["ai"]
+        else:
+            response = timed("/player-move", player.post, move)
+            if failed(response):
+                return False
+            if response["winner"] or response["draw"]:
+                return True
+            response = timed("/AI-move", player.post, {})
+            if failed(response):
+                return False
+        free.discard(response["aiRow"] * 3 + response["aiCol"])
+        if response["winner"] or response["draw"]:
+            return True
+
+
+def play_games(player, games, latencies, rng, history_every=10, turns="both"):
+    """Playing full games against the AI, latencies of every request are added to latencies[endpoint]."""
+    def timed(endpoint, call, *args):
+        start = time.perf_counter()
+        response = call(endpoint, *args)
+        latencies[endpoint].append(time.perf_counter() - start)
+        return response
+
+    timed("/start-game", player.get)
+    for number in range(games):
+        combined = turns == "combined" or (turns == "both" and number % 2 == 0)
+        strategy = rng.choice(("attack", "defence"))
+        if not play_game(timed, player, rng, strategy, combined):
+            # the board may be left in the middle of a game (or the session expired), next game on a new one
+            timed("/start-game", player.get)
+        if (number + 1) % history_every == 0:
+            timed("/history", player.get)
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    def at(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] * 1000
+    return {"count": len(ordered), "mean_ms": statistics.fmean(ordered) * 1000,
+            "p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def file_size(filename):
+    return sum(os.path.getsize(f) for f in (filename, filename + ".idx") if os.path.exists(f))
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024     # bytes on macOS, KiB on Linux
+
+
+def run(flask_app, mode="client", players=8, games=50, seed=0, turns="both"):
+    """Running the load test and returning the report."""
+    import history
+    base_url, server = None, None
+    if mode == "http":
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+    player_class = HttpPlayer if mode == "http" else TestClientPlayer
+
+    history_file = os.environ["HISTORY_FILE"]
+    history.get_writer().flush()
+    sessions_before, history_before, memory_before = len(flask_app.games), file_size(history_file), peak_memory_mb()
+
+    results = [{endpoint: [] for endpoint in ENDPOINTS} for _ in range(players)]
+    threads = [threading.Thread(target=play_games, args=(player_class(flask_app.app, base_url), games, results[i],
+                                                         random.Random(seed + i)), kwargs={"turns": turns})
+               for i in range(players)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    history.get_writer().flush()
+    if server is not None:
+        server.shutdown()
+
+    latencies = {endpoint: [sample for result in results for sample in result[endpoint]] for endpoint in ENDPOINTS}
+    requests = sum(len(samples) for samples in latencies.values())
+    history_growth = file_size(history_file) - history_before
+    memory_after = peak_memory_mb()
+    return {
+        "mode": mode,
+        "turns": turns,
+        "players": players,
+        "games_per_player": games,
+        "seconds": elapsed,
+        "games_per_second": players * games / elapsed,
+        "requests_per_second": requests / elapsed,
+        "endpoints": {endpoint: percentiles(samples) for endpoint, samples in latencies.items() if samples},
+        "sessions_added": len(flask_app.games) - sessions_before,
+        "history_bytes_added": history_growth,
+        "history_bytes_per_game": history_growth / (players * games),
+        "peak_memory_mb": memory_after,
+        "peak_memory_growth_mb": None if memory_after is None else memory_after - memory_before,
+        "history_writer": history.get_writer().stats(),
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returning the list of regressions: lower throughput or higher p95 latency than the baseline allows."""
+    regressions = []
+    change = report["games_per_second"] / baseline["games_per_second"] - 1
+    print(f"throughput: {report['games_per_second']:.1f} games/s, baseline {baseline['games_per_second']:.1f} ({change:+.0%})")
+    if change < -tolerance:
+        regressions.append("games_per_second")
+    for endpoint, stats in report["endpoints"].items():
+        if endpoint not in baseline["endpoints"]:
+            continue
+        change = stats["p95_ms"] / baseline["endpoints"][endpoint]["p95_ms"] - 1
+        print(f"{endpoint} p95: {stats['p95_ms']:.2f} ms, baseline {baseline['endpoints'][endpoint]['p95_ms']:.2f} ms ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(endpoint)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test of the Flask app with concurrent simulated players.")
+    parser.add_argument("--mode", choices=("client", "http"), default="client",
+                        help="Flask test client in-process or a real HTTP server on localhost")
+    parser.add_argument("--players", type=int, default=8, help="number of concurrent players")
+    parser.add_argument("--games", type=int, default=50, help="games played by every player")
+    parser.add_argument("--turns", choices=TURNS, default="both",
+                        help="one request per turn (combined), two (separate) or every other game each (both)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="fail if worse than baseline by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        flask_app = load_app(os.path.join(directory, "games_history.jsonl"))
+        report = run(flask_app, args.mode, args.players, args.games, args.seed, args.turns)
+        flask_app.history_store.get_writer().close()
+    print(json.dumps(report, indent=2))
+
+    failed = False
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if any(baseline.get(key) != report[key] for key in ("mode", "turns", "players")):
+            print("Baseline was measured with a different mode, turns or number of players, comparing anyway.")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"FAIL: worse than baseline by more than {args.tolerance:.0%}: {regressions}")
+            failed = True
+
+    sys.exit(1 if failed and args.check else 0)
@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import numpy as np
+
+# -----------------------------
+# MODEL MICRO-BENCHMARKS
+# -----------------------------
+# Timing the building blocks of training and inference on representative boards (empty,
+# mid-game, terminal and a state missing from the Q-table), plus throughput of whole training
+# episodes and evaluation games. Results are printed (and saved with --output) as JSON.
+#   python benchmarks/bench_model.py                        # all benchmarks
+#   python benchmarks/bench_model.py --filter trained_move  # report only matching benchmarks
+#   python benchmarks/bench_model.py --save-baseline        # store the result as the baseline
+#   python benchmarks/bench_model.py --check                # exit 1 on regression vs the baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "model_baseline.json")
+sys.path.insert(0, ROOT)
+
+import bitboard
+import qtable
+import model
+from game import Game
+
+BOARDS = {
+    "empty": [[None] * 3 for _ in range(3)],
+    "mid": [['X', None, 'O'], [None, 'X', None], [None, None, None]],
+    "terminal": [['X', 'X', 'X'], ['O', 'O', None], [None, None, None]],
+}
+
+
+def missing_board(Q_table):
+    """Legal, unfinished board with X to move that is not in the Q-table."""
+    for sid, key in enumerate(bitboard.STATE_KEYS):
+        x_mask, o_mask = bitboard.from_state_id(sid)
+        if (bin(x_mask).count('1') == bin(o_mask).count('1') and bitboard.free_cells(x_mask, o_mask)
+                and not bitboard.game_result(x_mask, o_mask)[0] and key not in Q_table):
+            return bitboard.decode(x_mask, o_mask)
+    raise ValueError("Q-table knows every state")
+
+
+def time_calls(function, args_list, repeat=5):
+    """Best of repeat runs of function(*args) over args_list, in nanoseconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for args in args_list:
+            function(*args)
+        best = min(best, (time.perf_counter_ns() - start) / len(args_list))
+    return {"ns_per_call": best, "calls_per_second": 1e9 / best}
+
+
+def bench_primitives(Q_table, calls):
+    boards = dict(BOARDS, missing=missing_board(Q_table))
+    arrays = {name: np.array(board, dtype=object) for name, board in boards.items()}
+    results = {}
+
+    for name, board in boards.items():
+        results[f"board_to_string/{name}"] = time_calls(model.board_to_string, [(board,)] * calls)
+        results[f"list_possible_moves/{name}"] = time_calls(model.list_possible_moves, [(board,)] * calls)
+        results[f"is_game_over/{name}"] = time_calls(model.is_game_over, [(board,)] * calls)
+        if name == "terminal":
+            continue    # no moves to choose
+        results[f"trained_move/{name}"] = time_calls(model.trained_move, [(arrays[name], Q_table)] * calls)
+        results[f"choose_action/{name}/greedy"] = time_calls(model.choose_action, [(board, Q_table, 0.0)] * calls)
+        results[f"choose_action/{name}/explore"] = time_calls(model.choose_action, [(board, Q_table, 1.0)] * calls)
+
+    # update_q_table on a small copy of the table, so the loaded Q-table is not changed
+    for name in ("empty", "mid", "missing"):
+        state = model.board_to_string(boards[name])
+        action = bitboard.free_cells(*bitboard.encode(boards[name]))[0]
+        next_board = [row[:] for row in boards[name]]
+        next_board[action[0]][action[1]] = 'X'
+        next_state = model.board_to_string(next_board)
+        table = {key: np.array(Q_table[key], dtype=float) for key in (state, next_state) if key in Q_table}
+        results[f"update_q_table/{name}"] = time_calls(model.update_q_table, [(table, state, action, next_state, 0.0)] * calls)
+
+    # make_move changes the game, every call gets its own copy of the position (moves do not end the game)
+    for name, player, move in (("empty", 'X', (1, 1)), ("mid", 'O', (1, 0))):
+        timing = None
+        for _ in range(5):
+            games = [Game(board=[row[:] for row in boards[name]], current_player=player) for _ in range(calls)]
+            run = time_calls(Game.make_move, [(game, *move) for game in games], repeat=1)
+            timing = run if timing is None or run["ns_per_call"] < timing["ns_per_call"] else timing
+        results[f"Game.make_move/{name}"] = timing
+    for name in ("mid", "terminal"):
+        game = Game(board=[row[:] for row in boards[name]])
+        results[f"Game.get_winning_line/{name}"] = time_calls(Game.get_winning_line, [(game,)] * calls)
+    return results
+
+
+def bench_throughput(Q_attack, Q_defence, episodes, games):
+    results = {}
+
+    start = time.perf_counter()
+    Q_attack, Q_defence = {}, {}
+    for episode in range(episodes):
+        model.train_episode(Q_attack, Q_defence, 0.5)
+    results["train_episode"] = {"episodes_per_second": episodes / (time.perf_counter() - start)}
+
+    import batch_training
+    trainer = batch_training.BatchTrainer(model.learning_rate, model.discount_factor, seed=0)
+    start = time.perf_counter()
+    trainer.train(0, episodes * 10, model.epsilon_min, model.epsilon_max, model.decay_rate)
+    results["batch_training"] = {"episodes_per_second": episodes * 10 / (time.perf_counter() - start)}
+
+    # every purpose is played with its own table, so the agent's moves are found in it
+    for purpose, Q_table in (("attack", Q_attack), ("defence", Q_defence)):
+        tables = {"dict": dict(Q_table.items()) if isinstance(Q_table, qtable.DenseQTable) else Q_table}
+        values, index = qtable.to_dense(tables["dict"])
+        tables["dense"] = qtable.DenseQTable(values, index)
+        for name, table in tables.items():
+            start = time.perf_counter()
+            model.simulate_games(purpose, table, games, random.Random(0))
+            results[f"simulate_games/{purpose}/{name}"] = {"games_per_second": games / (time.perf_counter() - start)}
+    return results
+
+
+def rate(result):
+    # every result has exactly one "... per second" value
+    return next(value for key, value in result.items() if key.endswith("per_second"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of training and inference primitives.")
+    parser.add_argument("--model", default="q_table_A_best.pkl", help="Q-table used by the benchmarks (attack)")
+    parser.add_argument("--defence-model", default="q_table_D_best.pkl", help="Q-table of the defence evaluation games")
+    parser.add_argument("--calls", type=int, default=20000, help="calls per primitive benchmark")
+    parser.add_argument("--episodes", type=int, default=5000, help="training episodes (x10 for batched training)")
+    parser.add_argument("--games", type=int, default=5000, help="evaluation games")
+    parser.add_argument("--filter", default="", help="report only benchmarks whose name contains this text")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="fail if slower than baseline by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    Q_table, Q_defence = model.load_model(args.model), model.load_model(args.defence_model)
+    for table, filename in ((Q_table, args.model), (Q_defence, args.defence_model)):
+        if table is None:
+            sys.exit(f"Q-table {filename} is needed for the benchmarks")
+
+    random.seed(0)
+    np.random.seed(0)
+    results = {**bench_primitives(Q_table, args.calls), **bench_throughput(Q_table, Q_defence, args.episodes, args.games)}
+    results = {name: result for name, result in results.items() if args.filter in name}
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "model": args.model,
+        "defence_model": args.defence_model,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            change = rate(result) / rate(baseline[name]) - 1
+            print(f"{name}: {change:+.0%}")
+            if change < -args.tolerance:
+                print(f"FAIL: {name} slower than baseline by more than {args.tolerance:.0%}")
+                failed = True
+
+    sys.exit(1 if failed and args.check else 0)
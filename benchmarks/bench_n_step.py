@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import numpy as np
+
+# -----------------------------
+# ONE-STEP VS N-STEP TRAINING
+# -----------------------------
+# How many episodes and how much training time each update mode needs until both agents reach
+# the target result against the random opponent. Agents are trained in steps of --eval-every
+# episodes and checked exactly (evaluation.exact_outcome) after every step; evaluation time is
+# not counted. Every mode is trained with --seeds seeds and the medians are reported.
+#   python benchmarks/bench_n_step.py                       # batched training, one-step vs n = 1, 3, 5
+#   python benchmarks/bench_n_step.py --target 90 --n-steps 2 3 --per-episode --max-episodes 50000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import model
+import batch_training
+from evaluation import exact_outcome
+
+
+def non_losses(Q_attack, Q_defence):
+    # % of games not lost against the random opponent, (attack, defence)
+    return tuple(100 * (1 - exact_outcome(purpose, Q_table)[2])
+                 for purpose, Q_table in (("attack", Q_attack), ("defence", Q_defence)))
+
+
+def episodes_to_target(n_step, target, max_episodes, eval_every, seed, alpha, batched):
+    """(episodes, training seconds) until both agents lose at most 100 - target % of games, None if never."""
+    schedule = (model.epsilon_min, model.epsilon_max, model.decay_rate)
+    if batched:
+        trainer = batch_training.BatchTrainer(alpha, model.discount_factor, seed=seed, n_step=n_step)
+    else:
+        rng = random.Random(seed)
+        Q_attack, Q_defence = {}, {}
+
+    seconds = 0.0
+    for start in range(0, max_episodes, eval_every):
+        end = min(start + eval_every, max_episodes)
+        begin = time.perf_counter()
+        if batched:
+            trainer.train(start, end, *schedule)
+        else:
+            epsilon_min, epsilon_max, decay_rate = schedule
+            for episode in range(start, end):
+                exploration_rate = epsilon_min + (epsilon_max - epsilon_min) * np.exp(-decay_rate * episode)
+                model.train_episode(Q_attack, Q_defence, exploration_rate, alpha, model.discount_factor, n_step, rng)
+        seconds += time.perf_counter() - begin
+
+        if batched:
+            Q_attack, Q_defence = trainer.view('X'), trainer.view('O')
+        if min(non_losses(Q_attack, Q_defence)) >= target:
+            return end, seconds
+    return None
+
+
+def compare(modes, target, max_episodes, eval_every, seeds, alpha, batched):
+    report = {}
+    for n_step in modes:
+        runs = [episodes_to_target(n_step, target, max_episodes, eval_every, seed, alpha, batched) for seed in range(seeds)]
+        reached = [run for run in runs if run is not None]
+        name = f"{n_step}-step" if n_step else "one-step (default)"
+        report[name] = {
+            "reached": f"{len(reached)}/{seeds}",
+            "episodes": statistics.median(run[0] for run in reached) if reached else None,
+            "seconds": round(statistics.median(run[1] for run in reached), 3) if reached else None,
+        }
+        print(f"{name}: {report[name]}", flush=True)
+
+    baseline = report[next(iter(report))]
+    for result in report.values():
+        if baseline["episodes"] and result["episodes"]:
+            result["episode_speedup"] = round(baseline["episodes"] / result["episodes"], 2)
+            result["time_speedup"] = round(baseline["seconds"] / result["seconds"], 2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Episodes and training time to a target result, one-step vs n-step updates.")
+    parser.add_argument("--target", type=float, default=90.0, help="%% of games both agents must not lose")
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[1, 3, 5], help="n of the n-step modes compared")
+    parser.add_argument("--max-episodes", type=int, default=500000)
+    parser.add_argument("--eval-every", type=int, default=5000, help="episodes between checks of the target")
+    parser.add_argument("--seeds", type=int, default=3, help="training runs of every mode")
+    parser.add_argument("--alpha", type=float, default=model.learning_rate, help="learning rate of all modes")
+    parser.add_argument("--per-episode", action="store_true", help="model.train_episode instead of batched training")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = compare([None] + args.n_steps, args.target, args.max_episodes, args.eval_every, args.seeds,
+                     args.alpha, not args.per_episode)
+    report = {"target": args.target, "alpha": args.alpha, "batched": not args.per_episode, "modes": report}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
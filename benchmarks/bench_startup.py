@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# -----------------------------
+# STARTUP BENCHMARK
+# -----------------------------
+# Measuring how long `import app` takes (with loading Q-tables and compiling policies) using
+# `python -X importtime`, and checking that training-only modules are not imported by the server.
+#   python benchmarks/bench_startup.py                      # report
+#   python benchmarks/bench_startup.py --save-baseline      # store the result as the baseline
+#   python benchmarks/bench_startup.py --check              # exit 1 on regression vs the baseline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+
+# modules the server must never import
+FORBIDDEN_MODULES = ("matplotlib", "scipy", "model", "batch_training", "training_metrics", "plot_training")
+
+
+def measure_once(module="app"):
+    """Returning {module name: cumulative import time in microseconds} of one fresh interpreter."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time:  self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(module="app", runs=5):
+    samples = [measure_once(module) for _ in range(runs)]
+    total = statistics.median(sample[module] for sample in samples)
+    imported = set().union(*samples)
+    # the slowest top-level dependencies of the last run
+    slowest = sorted(((name, us) for name, us in samples[-1].items() if name != module),
+                     key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "module": module,
+        "runs": runs,
+        "import_ms": total / 1000,
+        "forbidden_imported": sorted(name for name in imported if name.split(".")[0] in FORBIDDEN_MODULES),
+        "slowest": [{"module": name, "ms": us / 1000} for name, us in slowest],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time benchmark of the Flask app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="fail if slower than baseline by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    report = measure(runs=args.runs)
+    print(json.dumps(report, indent=2))
+
+    failed = False
+    if report["forbidden_imported"]:
+        print(f"FAIL: server imports training-only modules: {report['forbidden_imported']}")
+        failed = True
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        change = report["import_ms"] / baseline["import_ms"] - 1
+        print(f"import app: {report['import_ms']:.1f} ms, baseline {baseline['import_ms']:.1f} ms ({change:+.0%})")
+        if args.check and change > args.tolerance:
+            print(f"FAIL: startup slower than baseline by more than {args.tolerance:.0%}")
+            failed = True
+
+    sys.exit(1 if failed and args.check else 0)
@@ -0,0 +1,124 @@
+from itertools import product
+
+# -----------------------------
+# BITBOARD STATE ENCODING
+# -----------------------------
+# Board is kept as two 9-bit masks, one for X and one for O.
+# Bit i of a mask is the cell (row, col) with i = row * 3 + col:
+#
+#    0 | 1 | 2
+#    3 | 4 | 5
+#    6 | 7 | 8
+#
+# Everything that depends only on a mask (winning line, empty cells, base-3 value)
+# is precomputed for all 512 masks, so checks are a single tuple lookup.
+
+CELLS = tuple((row, col) for row in range(3) for col in range(3))
+FULL_MASK = 0b111111111
+
+WIN_LINES = (
+    ((0, 0), (0, 1), (0, 2)),
+    ((1, 0), (1, 1), (1, 2)),
+    ((2, 0), (2, 1), (2, 2)),
+    ((0, 0), (1, 0), (2, 0)),
+    ((0, 1), (1, 1), (2, 1)),
+    ((0, 2), (1, 2), (2, 2)),
+    ((0, 0), (1, 1), (2, 2)),
+    ((0, 2), (1, 1), (2, 0))
+)
+WIN_MASKS = tuple(sum(1 << (row * 3 + col) for row, col in line) for line in WIN_LINES)
+
+def cell_bit(row, col):
+    return 1 << (row * 3 + col)
+
+def _first_winning_line(mask):
+    for line, win_mask in zip(WIN_LINES, WIN_MASKS):
+        if mask & win_mask == win_mask:
+            return line
+    return None
+
+# mask -> first winning line (coordinates) or None
+WINNING_LINE = tuple(_first_winning_line(mask) for mask in range(512))
+
+# occupied mask -> tuple of empty cells as (row, col)
+FREE_CELLS = tuple(tuple(cell for i, cell in enumerate(CELLS) if not occupied >> i & 1) for occupied in range(512))
+
+# mask -> sum of 3^i over set bits, used to build the base-3 state id
+TERNARY = tuple(sum(3 ** i for i in range(9) if mask >> i & 1) for mask in range(512))
+
+NUM_STATES = 3 ** 9     # 19683 base-3 ids, including unreachable ones
+
+# state id -> Q-table key (same string as model.board_to_string gives, e.g. 'X-O------')
+STATE_KEYS = tuple(''.join(cells[::-1]) for cells in product('-XO', repeat=9))
+
+
+# -----------------------------
+# CONVERTERS
+# -----------------------------
+def encode(board):
+    """Converting board (nested lists or 3x3 np.array with 'X'/'O'/None) to (x_mask, o_mask)."""
+    x_mask = o_mask = 0
+    for i, (row, col) in enumerate(CELLS):
+        cell = board[row][col]
+        if cell == 'X':
+            x_mask |= 1 << i
+        elif cell == 'O':
+            o_mask |= 1 << i
+    return x_mask, o_mask
+
+def decode(x_mask, o_mask):
+    """Converting masks back to the board as nested lists."""
+    return [['X' if x_mask >> (row * 3 + col) & 1 else 'O' if o_mask >> (row * 3 + col) & 1 else None
+             for col in range(3)] for row in range(3)]
+
+def state_id(x_mask, o_mask):
+    """Base-3 id of the state (0 - 19682), empty cell = 0, X = 1, O = 2, cell 0 is the lowest digit."""
+    return TERNARY[x_mask] + 2 * TERNARY[o_mask]
+
+def state_key(x_mask, o_mask):
+    return STATE_KEYS[TERNARY[x_mask] + 2 * TERNARY[o_mask]]
+
+def from_state_id(sid):
+    x_mask = o_mask = 0
+    for i in range(9):
+        sid, digit = divmod(sid, 3)
+        if digit == 1:
+            x_mask |= 1 << i
+        elif digit == 2:
+            o_mask |= 1 << i
+    return x_mask, o_mask
+
+def from_key(key):
+    x_mask = o_mask = 0
+    for i, cell in enumerate(key):
+        if cell == 'X':
+            x_mask |= 1 << i
+        elif cell == 'O':
+            o_mask |= 1 << i
+    return x_mask, o_mask
+
+
+# -----------------------------
+# CHECKS
+# -----------------------------
+def winning_line(mask):
+    return WINNING_LINE[mask]
+
+def is_full(x_mask, o_mask):
+    return x_mask | o_mask == FULL_MASK
+
+def free_cells(x_mask, o_mask):
+    return FREE_CELLS[x_mask | o_mask]
+
+def is_free(x_mask, o_mask, row, col):
+    return not (x_mask | o_mask) >> (row * 3 + col) & 1
+
+def game_result(x_mask, o_mask):
+    """Same result as model.is_game_over: (True, 'X'/'O'/'draw') or (False, None)."""
+    if WINNING_LINE[x_mask]:
+        return True, 'X'
+    if WINNING_LINE[o_mask]:
+        return True, 'O'
+    if x_mask | o_mask == FULL_MASK:
+        return True, 'draw'
+    return False, None
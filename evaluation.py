@@ -0,0 +1,145 @@
+import argparse
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import bitboard
+import policy
+from model import simulate_games, load_model
+
+# -----------------------------
+# PARALLEL EVALUATION
+# -----------------------------
+# Evaluation games are split into one shard per worker process. Every shard has its own
+# random generator seeded from np.random.SeedSequence(seed), so the result depends only on
+# (seed, workers) and not on how the processes are scheduled.
+
+_worker_Q_table = None
+
+def _init_worker(Q_table):
+    # Q-table is sent to each worker once, not with every shard
+    global _worker_Q_table
+    _worker_Q_table = Q_table
+
+def _simulate_shard(purpose, games, seed):
+    return simulate_games(purpose, _worker_Q_table, games, rng=random.Random(seed))
+
+
+def shard_seeds(seed, workers):
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(workers)]
+
+def shard_sizes(games, workers):
+    return [games // workers + (1 if i < games % workers else 0) for i in range(workers)]
+
+
+def simulate_games_parallel(purpose, model, games=1000, workers=None, seed=0):
+    """
+        simulate_games split across a process pool.
+
+        Args:
+            purpose (str): 'attack' or 'defence'.
+            model: Q-table of the agent.
+            games (int): number of games.
+            workers (int): number of processes, all CPU cores by default.
+            seed (int): seed of the evaluation, the same (seed, workers) gives the same result.
+
+        Returns:
+            Tuple: (wins, draws, losses).
+        """
+    if purpose not in ('attack', 'defence'):
+        raise ValueError(f"Unknown evaluate purpose: {purpose}")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, games))
+    seeds = shard_seeds(seed, workers)
+    sizes = shard_sizes(games, workers)
+
+    if workers == 1:
+        return simulate_games(purpose, model, games, rng=random.Random(seeds[0]))
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model,)) as pool:
+        results = list(pool.map(_simulate_shard, [purpose] * workers, sizes, seeds))
+
+    wins, draws, losses = (sum(counts) for counts in zip(*results))
+    return wins, draws, losses
+
+
+# -----------------------------
+# EXACT EVALUATION
+# -----------------------------
+# Against a uniformly random opponent the result does not have to be sampled: one memoized
+# pass over the reachable positions gives the exact probabilities. The agent plays like
+# trained_move - uniformly among the moves with the highest Q value, random move in unknown states.
+
+def exact_outcome(purpose, model):
+    """
+        Exact result of the agent against a uniformly random opponent.
+
+        Args:
+            purpose (str): 'attack' or 'defence'.
+            model: Q-table of the agent (dict, canonical or dense).
+
+        Returns:
+            Tuple: probabilities (win, draw, loss).
+        """
+    if purpose not in ('attack', 'defence'):
+        raise ValueError(f"Unknown evaluate purpose: {purpose}")
+    best = policy.compile_policy(model).tolist()
+    agent_is_x = purpose == 'attack'
+    memo = {}
+
+    def outcome(x_mask, o_mask, x_to_move):
+        # probabilities (X wins, O wins, draw) from this position
+        sid = bitboard.state_id(x_mask, o_mask)
+        if sid in memo:
+            return memo[sid]
+        if bitboard.WINNING_LINE[x_mask]:
+            result = (1.0, 0.0, 0.0)
+        elif bitboard.WINNING_LINE[o_mask]:
+            result = (0.0, 1.0, 0.0)
+        elif x_mask | o_mask == bitboard.FULL_MASK:
+            result = (0.0, 0.0, 1.0)
+        else:
+            moves = best[sid] if x_to_move == agent_is_x else 0
+            moves = moves or bitboard.FULL_MASK & ~(x_mask | o_mask)     # opponent or unknown state: any free cell
+            cells = [1 << i for i in range(9) if moves >> i & 1]
+            x_wins = o_wins = draws = 0.0
+            for bit in cells:
+                if x_to_move:
+                    child = outcome(x_mask | bit, o_mask, False)
+                else:
+                    child = outcome(x_mask, o_mask | bit, True)
+                x_wins, o_wins, draws = x_wins + child[0], o_wins + child[1], draws + child[2]
+            result = (x_wins / len(cells), o_wins / len(cells), draws / len(cells))
+        memo[sid] = result
+        return result
+
+    x_wins, o_wins, draws = outcome(0, 0, True)
+    return (x_wins, draws, o_wins) if agent_is_x else (o_wins, draws, x_wins)
+
+
+if __name__ == "__main__":
+    # python evaluation.py q_table_A_best.pkl attack --games 1000000
+    # python evaluation.py q_table_A_best.pkl attack --exact
+    parser = argparse.ArgumentParser(description="Parallel evaluation of a Q-table against a random opponent.")
+    parser.add_argument("model", help="Q-table file, e.g. q_table_A_best.pkl")
+    parser.add_argument("purpose", choices=["attack", "defence"])
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--exact", action="store_true", help="exact probabilities instead of playing games")
+    args = parser.parse_args()
+
+    if args.exact:
+        win, draw, loss = exact_outcome(args.purpose, load_model(args.model))
+        print(f"PURPOSE: {args.purpose}, exact")
+        print(f"Win-ratio: {win * 100:.4f}%")
+        print(f"Draw-ratio: {draw * 100:.4f}%")
+        print(f"Lose-ratio: {loss * 100:.4f}%")
+        raise SystemExit
+
+    wins, draws, losses = simulate_games_parallel(args.purpose, load_model(args.model), args.games, args.workers, args.seed)
+    print(f"PURPOSE: {args.purpose}, games: {args.games}, seed: {args.seed}")
+    print(f"Wins: {wins}, Draws: {draws}, Losses: {losses}")
+    print(f"Win-ratio: {wins / args.games * 100:.2f}%")
+    print(f"Draw-ratio: {draws / args.games * 100:.2f}%")
+    print(f"Lose-ratio: {losses / args.games * 100:.2f}%")
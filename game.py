@@ -1,10 +1,11 @@
-import copy
-import os
-import json
+from datetime import datetime, timezone
+import history
+import bitboard
 
 class Game:
     def __init__(self, board=None, current_player='X', game_over=False, winner=None, winning_line=None, strategy='defence'):
         self.board = board or [[None]*3 for _ in range(3)]
+        self.x_mask, self.o_mask = bitboard.encode(self.board)   # bitboard copy of the board used by all checks
         self.current_player = current_player
         self.game_over = game_over
         self.winner = winner
@@ -15,6 +16,20 @@ class Game:
     def __repr__(self):
         return f"{type(self).__name__}(board = {self.board}, current_player = {self.current_player}, game_over = {self.game_over}, winner = {self.winner}, move_log = {self.move_log} winning_line = {self.winning_line}, strategy = {self.strategy})"
 
+    def to_state(self):
+        # compact state of the game kept by a shared session store (sessions.py), the board is stored as two bitmasks
+        return {"x": self.x_mask, "o": self.o_mask, "player": self.current_player, "game_over": self.game_over,
+                "winner": self.winner, "winning_line": self.winning_line, "strategy": self.strategy,
+                "moves": self.move_log}
+
+    @classmethod
+    def from_state(cls, state):
+        game = cls(board=bitboard.decode(state["x"], state["o"]), current_player=state["player"],
+                   game_over=state["game_over"], winner=state["winner"], winning_line=state["winning_line"],
+                   strategy=state["strategy"])
+        game.move_log = history.move_cells(state["moves"])
+        return game
+
     def switch_player(self):
         if self.current_player == 'X':
             self.current_player = 'O'
@@ -22,74 +37,44 @@ class Game:
             self.current_player = 'X'
 
     def get_winning_line(self):
-        b = self.board
-        winning_lines = [
-            [(0, 0), (0, 1), (0, 2)],
-            [(1, 0), (1, 1), (1, 2)],
-            [(2, 0), (2, 1), (2, 2)],
-            [(0, 0), (1, 0), (2, 0)],
-            [(0, 1), (1, 1), (2, 1)],
-            [(0, 2), (1, 2), (2, 2)],
-            [(0, 0), (1, 1), (2, 2)],
-            [(0, 2), (1, 1), (2, 0)]
-        ]
-
-        for line in winning_lines:
-            values = []
-            for (r, c) in line:
-                values.append(b[r][c])
-            if values[0] is not None and values[0] == values[1] and values[1] == values[2]:
-                return line
-        return None
+        return bitboard.winning_line(self.x_mask) or bitboard.winning_line(self.o_mask)
 
     def check_full_board(self):
-        return all(element is not None for row in self.board for element in row)
+        return bitboard.is_full(self.x_mask, self.o_mask)
 
     def reset_game(self):
         self.board = [[None] * 3 for _ in range(3)]
+        self.x_mask = self.o_mask = 0
         self.current_player = 'X'
         self.game_over = False
         self.winner = None
         self.move_log = []
 
     def save_move_to_log(self, row, col):
-        self.move_log.append({
-            "player": self.current_player,
-            "position": [row, col],
-            "board": copy.deepcopy(self.board)
-        })
+        # only the cell of the move, players alternate starting with X (see history.py)
+        self.move_log.append(row * 3 + col)
 
     def save_game_result(self, winner):
-        filename = 'games_history.json'
-        games_history = []
-
-        # Wczytanie istniejącej historii, jeśli plik istnieje
-        if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                try:
-                    games_history = json.load(f)
-                except json.JSONDecodeError:
-                    games_history = []
-
-        # Dodanie aktualnej gry
-        games_history.append({
-            "moves": self.move_log,
-            "board": self.board,
-            "result": winner or "DRAW"
+        # Dopisanie aktualnej gry na koniec historii (bez wczytywania poprzednich gier),
+        # zapis na dysk odbywa się w tle (history.BackgroundHistoryWriter)
+        history.get_writer().append({
+            "moves": list(self.move_log),      # queued until written, the log may be reset before
+            "result": winner or "DRAW",
+            "strategy": self.strategy,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec='seconds')
         })
 
-        # Zapis całości do pliku
-        with open(filename, 'w') as f:
-            json.dump(games_history, f, indent=2)
-
-        print("Saved game: success")
-
     def make_move(self, row, col):
-        b = self.board
-        if b[row][col] is not None:
+        if not (0 <= row < 3 and 0 <= col < 3):
+            raise ValueError("The field is outside the board!")
+        if not bitboard.is_free(self.x_mask, self.o_mask, row, col):
             raise ValueError("The field is already occupied!")
         else:
-            b[row][col] = self.current_player
+            self.board[row][col] = self.current_player
+            if self.current_player == 'X':
+                self.x_mask |= bitboard.cell_bit(row, col)
+            else:
+                self.o_mask |= bitboard.cell_bit(row, col)
             self.save_move_to_log(row, col)
             self.winning_line = self.get_winning_line()
             if self.winning_line:
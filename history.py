@@ -0,0 +1,681 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+import bitboard
+import instrumentation
+
+# -----------------------------
+# GAME HISTORY STORE
+# -----------------------------
+# Finished games are only ever appended to the history, so every game costs the same
+# no matter how many games were played before. Two backends are available:
+#   - JsonLinesHistoryWriter: one JSON object per line (default, games_history.jsonl)
+#   - SQLiteHistoryWriter: SQLite database in WAL mode (safe for many worker processes)
+# Both share the HistoryWriter interface, so a custom backend only has to implement
+# write_batch() and iter_games(). Backends with an index (both built-in ones) also
+# override query(), so reading one page of history does not read the whole history.
+
+DEFAULT_HISTORY_FILE = 'games_history.jsonl'
+LEGACY_HISTORY_FILE = 'games_history.json'
+
+try:
+    import fcntl  # file locking on Linux/macOS, not available on Windows
+except ImportError:
+    fcntl = None
+
+# Moves of a game are stored as cells (0-8, cell = row * 3 + col) in the order they were played.
+# X always starts, so players alternate X, O, X, ... and boards after every move are rebuilt
+# only when the history is viewed (replay_moves). Games saved by older versions keep a list
+# of {"player", "position", "board"} moves and a final "board"; move_cells reads both formats.
+
+# codes of results and strategies kept in the history index
+RESULT_CODES = {'X': 1, 'O': 2, 'DRAW': 3}
+STRATEGY_CODES = {'attack': 1, 'defence': 2, 'perfect': 3}
+
+
+def parse_time(value):
+    """Converting ISO date/datetime string (or epoch number) to epoch seconds, None stays None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def record_time(record):
+    # games saved before the finished_at field existed have no date
+    try:
+        return parse_time(record.get('finished_at'))
+    except ValueError:
+        return None
+
+
+def matches(record, result=None, strategy=None, since=None, until=None):
+    """Checking if a game record passes the history filters (since/until in epoch seconds)."""
+    if result is not None and record.get('result') != result:
+        return False
+    if strategy is not None and record.get('strategy') != strategy:
+        return False
+    if since is not None or until is not None:
+        finished_at = record_time(record)
+        if finished_at is None:
+            return False
+        if since is not None and finished_at < since:
+            return False
+        if until is not None and finished_at >= until:
+            return False
+    return True
+
+
+def move_cells(moves):
+    """Cells of the moves of a game, for both the compact and the old move log."""
+    return [move if isinstance(move, int) else move["position"][0] * 3 + move["position"][1] for move in moves]
+
+
+def compact_record(record):
+    """Game record with the compact move log (board snapshots of old records are dropped)."""
+    if all(isinstance(move, int) for move in record.get("moves", ())) and "board" not in record:
+        return record
+    compact = {key: value for key, value in record.items() if key != "board"}
+    compact["moves"] = move_cells(record.get("moves", ()))
+    return compact
+
+
+def replay_moves(moves):
+    """Generator of {"player", "position", "board"} for every move, the board after the move is built on demand."""
+    x_mask = o_mask = 0
+    for i, cell in enumerate(move_cells(moves)):
+        if i % 2 == 0:
+            player, x_mask = 'X', x_mask | 1 << cell
+        else:
+            player, o_mask = 'O', o_mask | 1 << cell
+        yield {"player": player, "position": list(divmod(cell, 3)), "board": bitboard.decode(x_mask, o_mask)}
+
+
+class HistoryWriter:
+    """
+        Base class of history backends.
+
+        Args:
+            batch_size (int): number of games buffered in memory before they are written.
+            fsync (bool): call fsync after every written batch (durable, but slower).
+        """
+    def __init__(self, batch_size=1, fsync=False):
+        self.batch_size = max(1, batch_size)
+        self.fsync = fsync
+        self._buffer = []
+        self._lock = threading.Lock()   # Flask serves requests from several threads
+
+    def append(self, game_record):
+        with self._lock:
+            self._buffer.append(game_record)
+            if len(self._buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def append_many(self, game_records):
+        with self._lock:
+            self._buffer.extend(game_records)
+            if len(self._buffer) >= self.batch_size:
+                self._write_buffer()
+
+    def flush(self):
+        with self._lock:
+            self._write_buffer()
+
+    def _write_buffer(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        start = time.perf_counter()
+        self.write_batch(batch)
+        instrumentation.HISTORY_WRITE_SECONDS.observe(time.perf_counter() - start)
+
+    def close(self):
+        self.flush()
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def iter_games(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"background": False}
+
+    def export(self, result=None, strategy=None, since=None, until=None, after_id=0):
+        """
+            Generator of filtered games (oldest first) with their numbers, nothing is kept in memory.
+            after_id skips games up to that number (e.g. the ones already processed by replay.py).
+            """
+        for number, record in enumerate(self.iter_games(), start=1):
+            if number > after_id and matches(record, result, strategy, since, until):
+                record['id'] = number
+                yield record
+
+    def query(self, result=None, strategy=None, since=None, until=None, offset=0, limit=20):
+        """
+            Returning one page of filtered games, newest first.
+
+            This default version streams the whole history once, backends with an index
+            override it.
+
+            Returns:
+                Tuple: (total number of matching games, list of games on the page).
+            """
+        numbers = [record['id'] for record in self.export(result, strategy, since, until)]
+        wanted = set(numbers[::-1][offset:offset + limit])
+        page = [record for record in self.export(result, strategy, since, until) if record['id'] in wanted]
+        return len(numbers), page[::-1]
+
+
+# one entry of the JSON Lines index: where the line is and the values used for filtering
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4'), ('finished_at', '<f8'),
+                        ('result', 'u1'), ('strategy', 'u1')])
+
+
+def index_entry(record, offset, length):
+    finished_at = record_time(record)
+    return (offset, length, np.nan if finished_at is None else finished_at,
+            RESULT_CODES.get(record.get('result'), 0), STRATEGY_CODES.get(record.get('strategy'), 0))
+
+
+class JsonLinesHistoryWriter(HistoryWriter):
+    """
+        History kept as JSON Lines with a binary index next to it (<filename>.idx).
+        The index has one fixed-size entry per game, so filtering and paging only read
+        the index and then the lines of the requested page. A page without filters reads
+        only its own index entries. Readers share a lock, writers lock the file exclusively.
+        """
+    def __init__(self, filename=DEFAULT_HISTORY_FILE, batch_size=1, fsync=False):
+        super().__init__(batch_size, fsync)
+        self.filename = filename
+        self.index_filename = filename + '.idx'
+
+    @staticmethod
+    def _flock(fd, shared=False):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+    def _open_locked(self, flags, shared=False):
+        fd = os.open(self.filename, flags, 0o644)
+        self._flock(fd, shared)
+        return fd
+
+    def write_batch(self, records):
+        lines = [(json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8') for record in records]
+
+        # O_APPEND + single write() keeps lines from different processes from interleaving
+        fd = self._open_locked(os.O_RDWR | os.O_APPEND | os.O_CREAT)
+        try:
+            self._sync_index(fd)        # indexing lines written without index (e.g. by old versions)
+            offset = os.fstat(fd).st_size
+            entries = []
+            for record, line in zip(records, lines):
+                entries.append(index_entry(record, offset, len(line)))
+                offset += len(line)
+
+            os.write(fd, b''.join(lines))
+            self._append_index(np.array(entries, dtype=INDEX_DTYPE))
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)    # closing the descriptor also releases the lock
+
+    def _append_index(self, entries):
+        with open(self.index_filename, 'ab') as f:
+            f.write(entries.tobytes())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _index_size(self):
+        return os.path.getsize(self.index_filename) if os.path.exists(self.index_filename) else 0
+
+    def _read_index(self, start=0, stop=None):
+        """Index entries of games start..stop-1 (all by default), only these entries are read."""
+        count = self._index_size() // INDEX_DTYPE.itemsize
+        stop = count if stop is None else min(stop, count)
+        if start >= stop:
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(self.index_filename, dtype=INDEX_DTYPE, count=stop - start,
+                           offset=start * INDEX_DTYPE.itemsize)
+
+    def _indexed_end(self):
+        """Returning the file position after the last indexed line, only the last index entry is read."""
+        if not os.path.exists(self.index_filename):
+            return 0
+        size = os.path.getsize(self.index_filename)
+        count = size // INDEX_DTYPE.itemsize
+        if size != count * INDEX_DTYPE.itemsize:
+            # dropping a partially written entry left by a crash
+            os.truncate(self.index_filename, count * INDEX_DTYPE.itemsize)
+        if count == 0:
+            return 0
+        with open(self.index_filename, 'rb') as f:
+            f.seek((count - 1) * INDEX_DTYPE.itemsize)
+            last = np.frombuffer(f.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)[0]
+        return int(last['offset'] + last['length'])
+
+    def _sync_index(self, fd):
+        """Indexing lines at the end of the file which are not in the index yet, fd has to be locked."""
+        indexed_end = self._indexed_end()
+        if indexed_end >= os.fstat(fd).st_size:
+            return
+
+        entries = []
+        with open(self.filename, 'rb') as f:
+            f.seek(indexed_end)
+            offset = indexed_end
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break       # line still being written
+                if line.strip():
+                    try:
+                        entries.append(index_entry(json.loads(line), offset, len(line)))
+                    except json.JSONDecodeError:
+                        pass    # skipping a line truncated by a crash
+                offset += len(line)
+
+        self._append_index(np.array(entries, dtype=INDEX_DTYPE))
+
+    @contextmanager
+    def _locked_index(self):
+        """
+            Shared lock of the history for reading the index, yielding the number of indexed games.
+            Only when lines are missing in the index (or its last entry is cut off) the lock is
+            changed to an exclusive one to index them first.
+            """
+        if not os.path.exists(self.filename):
+            yield 0
+            return
+        fd = self._open_locked(os.O_RDONLY, shared=True)
+        try:
+            if self._index_size() % INDEX_DTYPE.itemsize or self._indexed_end() < os.fstat(fd).st_size:
+                self._flock(fd)
+                self._sync_index(fd)
+                self._flock(fd, shared=True)
+            yield self._index_size() // INDEX_DTYPE.itemsize
+        finally:
+            os.close(fd)
+
+    def load_index(self):
+        with self._locked_index():
+            return self._read_index()
+
+    def iter_games(self):
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # skipping a line truncated by a crash
+
+    def _select(self, index, result=None, strategy=None, since=None, until=None):
+        selected = np.ones(len(index), dtype=bool)
+        if result is not None:
+            selected &= index['result'] == RESULT_CODES.get(result, -1)
+        if strategy is not None:
+            selected &= index['strategy'] == STRATEGY_CODES.get(strategy, -1)
+        if since is not None:
+            selected &= index['finished_at'] >= since       # NaN (no date) never passes
+        if until is not None:
+            selected &= index['finished_at'] < until
+        return np.flatnonzero(selected)
+
+    def _read_records(self, entries, positions):
+        # entries - index entries of the games at positions (game id = position + 1)
+        # nothing to read before the first game is saved (the file does not exist yet)
+        if len(positions) == 0 or not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'rb') as f:
+            for entry, position in zip(entries, positions):
+                f.seek(int(entry['offset']))
+                record = json.loads(f.read(int(entry['length'])))
+                record['id'] = int(position) + 1
+                yield record
+
+    def export(self, result=None, strategy=None, since=None, until=None, after_id=0):
+        with self._locked_index():
+            if result is None and strategy is None and since is None and until is None:
+                entries = self._read_index(after_id)
+                positions = np.arange(after_id, after_id + len(entries))
+            else:
+                index = self._read_index()
+                positions = self._select(index, result, strategy, since, until)
+                positions = positions[positions >= after_id]
+                entries = index[positions]
+        yield from self._read_records(entries, positions)
+
+    def query(self, result=None, strategy=None, since=None, until=None, offset=0, limit=20):
+        with self._locked_index() as count:
+            if result is None and strategy is None and since is None and until is None:
+                # newest first: the page is one run of index entries, only these are read
+                stop = max(count - offset, 0)
+                start = max(stop - limit, 0)
+                total, entries, page = count, self._read_index(start, stop)[::-1], np.arange(stop - 1, start - 1, -1)
+            else:
+                index = self._read_index()
+                positions = self._select(index, result, strategy, since, until)
+                total, page = len(positions), positions[::-1][offset:offset + limit]
+                entries = index[page]
+        return total, list(self._read_records(entries, page))
+
+
+class SQLiteHistoryWriter(HistoryWriter):
+    def __init__(self, filename='games_history.sqlite3', batch_size=1, fsync=False):
+        super().__init__(batch_size, fsync)
+        self.filename = filename
+        self._conn = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # synchronous=FULL syncs the WAL on every commit, NORMAL only on checkpoints
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS games (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)")
+        self._create_index_columns()
+        self._conn.commit()
+
+    def _create_index_columns(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(games)")}
+        if 'result' not in columns:
+            # database created by a version without filter columns, filling them from the stored JSON
+            self._conn.execute("ALTER TABLE games ADD COLUMN result TEXT")
+            self._conn.execute("ALTER TABLE games ADD COLUMN strategy TEXT")
+            self._conn.execute("ALTER TABLE games ADD COLUMN finished_at REAL")
+            rows = self._conn.execute("SELECT id, data FROM games").fetchall()
+            self._conn.executemany("UPDATE games SET result = ?, strategy = ?, finished_at = ? WHERE id = ?",
+                                   [(*self._columns(json.loads(data)), game_id) for game_id, data in rows])
+        self._conn.execute("CREATE INDEX IF NOT EXISTS games_result ON games (result, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS games_strategy ON games (strategy, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS games_finished_at ON games (finished_at)")
+
+    @staticmethod
+    def _columns(record):
+        return record.get('result'), record.get('strategy'), record_time(record)
+
+    def write_batch(self, records):
+        with self._conn:
+            self._conn.executemany("INSERT INTO games (data, result, strategy, finished_at) VALUES (?, ?, ?, ?)",
+                                   [(json.dumps(record, separators=(',', ':')), *self._columns(record))
+                                    for record in records])
+
+    def _read(self, sql, parameters=()):
+        # separate connection, so reading never waits for (or interferes with) the writer
+        conn = sqlite3.connect(self.filename, timeout=30)
+        try:
+            yield from conn.execute(sql, parameters)
+        finally:
+            conn.close()
+
+    def iter_games(self):
+        for (data,) in self._read("SELECT data FROM games ORDER BY id"):
+            yield json.loads(data)
+
+    @staticmethod
+    def _where(result, strategy, since, until):
+        conditions, parameters = [], []
+        for condition, value in (("result = ?", result), ("strategy = ?", strategy),
+                                 ("finished_at >= ?", since), ("finished_at < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+    def export(self, result=None, strategy=None, since=None, until=None, after_id=0):
+        where, parameters = self._where(result, strategy, since, until)
+        where += (" AND" if where else " WHERE") + " id > ?"
+        for game_id, data in self._read(f"SELECT id, data FROM games{where} ORDER BY id", parameters + [after_id]):
+            record = json.loads(data)
+            record['id'] = game_id
+            yield record
+
+    def query(self, result=None, strategy=None, since=None, until=None, offset=0, limit=20):
+        where, parameters = self._where(result, strategy, since, until)
+        (total,), = self._read(f"SELECT COUNT(*) FROM games{where}", parameters)
+        page = []
+        for game_id, data in self._read(f"SELECT id, data FROM games{where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                                        parameters + [limit, offset]):
+            record = json.loads(data)
+            record['id'] = game_id
+            page.append(record)
+        return total, page
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+OVERFLOW_POLICIES = ('block', 'drop', 'sync')
+
+
+class BackgroundHistoryWriter(HistoryWriter):
+    """
+        Writer handing finished games to a background thread, so the request finishing a game
+        does not wait for the disk. The thread writes all games waiting in the queue as one batch.
+
+        Args:
+            writer (HistoryWriter): backend writing the games (reading is passed to it as well).
+            max_queue (int): maximum number of games waiting to be written.
+            overflow (str): what happens to a game when the queue is full:
+                            'block' - waiting for a free place (at most block_timeout seconds, then the game is dropped),
+                            'drop' - dropping the game at once,
+                            'sync' - writing the game in the calling thread.
+            max_batch (int): maximum number of games written at once.
+        """
+    def __init__(self, writer, max_queue=10000, overflow='block', max_batch=500, block_timeout=5.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        super().__init__()
+        self.writer = writer
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.max_batch = max(1, max_batch)
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self._closed = False
+
+        # statistics, times in seconds
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.write_time = 0.0
+        self.last_write_time = 0.0
+        self.max_write_time = 0.0
+        self.max_wait_time = 0.0    # from append() to the end of writing
+
+    def _start(self):
+        # started on first use and again in a forked worker process, which does not inherit threads
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def append(self, game_record):
+        item = (time.monotonic(), game_record)
+        if self._closed:
+            self._write([item])     # games finished during shutdown
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == 'sync':
+                self._write([item])
+            else:
+                with self._lock:
+                    self.dropped += 1
+
+    def _run(self):
+        stop = False
+        while not stop:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items    # close() puts None after the last game
+            self._write([item for item in items if item is not None])
+            for _ in items:
+                self._queue.task_done()
+
+    def _write(self, items):
+        if not items:
+            return
+        start = time.monotonic()
+        try:
+            self.writer.append_many([record for _, record in items])
+            self.writer.flush()
+        except Exception as e:
+            # the thread has to keep working, games of the failed batch are lost
+            print(f"Writing game history failed: {e}")
+            with self._lock:
+                self.failed += len(items)
+            return
+
+        end = time.monotonic()
+        with self._lock:
+            self.written += len(items)
+            self.batches += 1
+            self.last_write_time = end - start
+            self.write_time += end - start
+            self.max_write_time = max(self.max_write_time, end - start)
+            self.max_wait_time = max(self.max_wait_time, end - min(queued_at for queued_at, _ in items))
+
+    def flush(self):
+        """Waiting until all queued games are written."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        self.writer.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.writer.close()
+
+    def iter_games(self):
+        return self.writer.iter_games()
+
+    def export(self, result=None, strategy=None, since=None, until=None, after_id=0):
+        return self.writer.export(result, strategy, since, until, after_id)
+
+    def query(self, result=None, strategy=None, since=None, until=None, offset=0, limit=20):
+        return self.writer.query(result, strategy, since, until, offset, limit)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "background": True,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "overflow": self.overflow,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "last_write_ms": round(self.last_write_time * 1000, 3),
+                "avg_write_ms": round(self.write_time / self.batches * 1000, 3) if self.batches else 0.0,
+                "max_write_ms": round(self.max_write_time * 1000, 3),
+                "max_wait_ms": round(self.max_wait_time * 1000, 3),
+            }
+
+
+def create_writer(backend=None, filename=None, batch_size=None, fsync=None, background=None):
+    """
+        Creating history writer, values not given are read from environment variables:
+        HISTORY_BACKEND (jsonl/sqlite), HISTORY_FILE, HISTORY_BATCH_SIZE, HISTORY_FSYNC (0/1),
+        HISTORY_BACKGROUND (0/1, writing in a background thread, default 1) and for the background
+        writer HISTORY_QUEUE_SIZE and HISTORY_OVERFLOW (block/drop/sync).
+        """
+    backend = backend or os.environ.get('HISTORY_BACKEND', 'jsonl')
+    batch_size = batch_size if batch_size is not None else int(os.environ.get('HISTORY_BATCH_SIZE', '1'))
+    fsync = fsync if fsync is not None else os.environ.get('HISTORY_FSYNC', '0') == '1'
+    filename = filename or os.environ.get('HISTORY_FILE')
+    background = background if background is not None else os.environ.get('HISTORY_BACKGROUND', '1') == '1'
+
+    if backend == 'jsonl':
+        writer = JsonLinesHistoryWriter(filename or DEFAULT_HISTORY_FILE, batch_size, fsync)
+    elif backend == 'sqlite':
+        writer = SQLiteHistoryWriter(filename or 'games_history.sqlite3', batch_size, fsync)
+    else:
+        raise ValueError(f"Unknown history backend: {backend}")
+
+    if background:
+        writer = BackgroundHistoryWriter(writer, int(os.environ.get('HISTORY_QUEUE_SIZE', '10000')),
+                                         os.environ.get('HISTORY_OVERFLOW', 'block'))
+    return writer
+
+
+# writer shared by all games of the process, created on first use
+_writer = None
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = create_writer()
+        atexit.register(lambda: _writer.close())    # writing games still buffered or queued on shutdown
+    return _writer
+
+def set_writer(writer):
+    global _writer
+    _writer = writer
+
+
+# -----------------------------
+# MIGRATION
+# -----------------------------
+def migrate_json_history(source=LEGACY_HISTORY_FILE, writer=None):
+    """
+        One-shot migration of the old games_history.json (one JSON list) to the append-only store.
+
+        Returns:
+            int: number of migrated games.
+        """
+    if not os.path.exists(source):
+        print(f"File '{source}' has not been found.")
+        return 0
+
+    with open(source, 'r') as f:
+        try:
+            games_history = json.load(f)
+        except json.JSONDecodeError:
+            print(f"File '{source}' is not a valid JSON file.")
+            return 0
+
+    writer = writer or get_writer()
+    for game in games_history:
+        writer.append(compact_record(game))
+    writer.flush()
+
+    # keeping the old file, but under a name that will not be migrated twice
+    os.replace(source, source + '.migrated')
+    print(f"Migrated {len(games_history)} games from {source}")
+    return len(games_history)
+
+
+if __name__ == "__main__":
+    migrate_json_history()
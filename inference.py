@@ -0,0 +1,133 @@
+import numpy as np
+import random
+import pickle
+import os
+import bitboard
+import qtable
+import symmetry
+
+# -----------------------------
+# INFERENCE
+# -----------------------------
+# Everything the game server needs to load Q-tables and play trained moves. Training
+# (model.py) imports it from here; the server imports only this module, so it never
+# pays for loading the training code.
+
+# -----------------------------
+# AUXILIARY FUNCTIONS
+# -----------------------------
+
+# list of tuples representing all moves in TIC TAC TOE game
+ACTIONS = list(bitboard.CELLS)
+
+# Functions below take the board as array (nested lists or np.array), training and inference
+# work on bitboards (x_mask, o_mask) from bitboard.py, functions for them end with _bits.
+
+#function converting board as array to string to represent state in Q table
+def board_to_string(board):
+    return bitboard.state_key(*bitboard.encode(board))
+
+# return list of tuples with coordinates of empty cells
+def list_possible_moves(board):
+    possible_moves = bitboard.free_cells(*bitboard.encode(board))
+    if not possible_moves:
+        return None  # no moves
+
+    return list(possible_moves)
+
+#return tuple with random move
+def random_move(board):
+    return random_move_bits(*bitboard.encode(board))
+
+def random_move_bits(x_mask, o_mask, rng=None):
+    # rng: random.Random used instead of the global NumPy generator (for reproducible evaluation)
+    possible_moves = bitboard.free_cells(x_mask, o_mask)
+
+    if possible_moves:
+        index = np.random.randint(len(possible_moves)) if rng is None else rng.randrange(len(possible_moves))
+        return possible_moves[index]
+    else:
+        return None
+
+def is_game_over(board):
+    return bitboard.game_result(*bitboard.encode(board))   # WIN -> True, winner
+                                                            # DRAW -> True, 'draw'
+                                                            # STILL PLAYING -> False, None
+
+def is_board_full(board):
+    return bitboard.is_full(*bitboard.encode(board))
+
+
+# -----------------------------
+# SAVE AND LOAD
+# -----------------------------
+def save_model(Q_table, filename="q_table.pkl"):
+    try:
+        with open(filename, "wb") as f:
+            pickle.dump(Q_table, f)
+            print(f"Saved a file named: {filename}")
+    except Exception as e:
+        print(f"An error occurred while saving: {e}")
+
+
+def load_model(filename="q_table.pkl"):
+    # dense version of the table (see qtable.py) is preferred, if it is not older than the pickle
+    prefix = qtable.dense_prefix(filename)
+    if qtable.exists(prefix) and (not os.path.exists(filename) or
+                                  os.path.getmtime(qtable.table_files(prefix)[0]) >= os.path.getmtime(filename)):
+        try:
+            Q_table = qtable.load_dense(prefix)
+            print(f"File successfully loaded: {prefix} (dense, memory-mapped)!")
+            return Q_table
+        except Exception as e:
+            print(f"An error occurred while loading the dense model, loading {filename}: {e}")
+
+    try:
+        with open(filename, "rb") as f:
+            print(f"File successfully loaded: {filename}!")
+            return pickle.load(f)
+    except FileNotFoundError:
+        print(f"File '{filename}' has not been found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred while loading the model: {e}")
+        return None
+
+# -----------------------------
+# PERFORM TRAINED MOVE
+# -----------------------------
+def trained_move(board, Q_table):
+    """
+        Choosing the best move basen on trained Q-table.
+
+        Args:
+            board (np.array): Current state of board.
+            Q_table (dict): table with Q values,
+
+        Returns:
+            Tuple: (row, col) representing the best move.
+            None: if there are no moves available.
+        """
+    return trained_move_bits(*bitboard.encode(board), Q_table)
+
+def trained_move_bits(x_mask, o_mask, Q_table, rng=None):
+    # trained_move for a board given as bitboards (x_mask, o_mask), rng: optional random.Random
+    possible_moves = bitboard.free_cells(x_mask, o_mask)
+
+    if not possible_moves:
+        return None
+
+    q_values = symmetry.lookup(Q_table, x_mask, o_mask)   # Q values in the orientation of the board
+    if q_values is None:
+        # print("Unknown state, making a random move.")
+        return random_move_bits(x_mask, o_mask, rng)
+
+    # Find the Q values for available moves
+    empty_q_values = [q_values[row, col] for (row, col) in possible_moves]
+    max_q_value = max(empty_q_values)
+
+    # Randomly choose one of all moves with the highest Q value to avoid determinism
+    best_moves_indices = [i for i, q_val in enumerate(empty_q_values) if q_val == max_q_value]
+    best_move_index = (rng or random).choice(best_moves_indices)
+
+    return possible_moves[best_move_index]
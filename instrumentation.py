@@ -0,0 +1,131 @@
+import bisect
+import os
+import threading
+
+# -----------------------------
+# INSTRUMENTATION
+# -----------------------------
+# Small, dependency-free metrics (counters, histograms and values read on demand) rendered in
+# the Prometheus text format by the server's /metrics endpoint. Metrics are kept per process.
+# METRICS_ENABLED=0 turns everything off: inc()/observe() return at once and the server does
+# not register its request hooks at all.
+
+enabled = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+# latency buckets in seconds, from 50 microseconds (one AI move) to seconds (slow disk)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        if not enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}   # label values -> [count in every bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, *label_values):
+        if not enabled:
+            return
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bucket] += 1
+            entry[1] += value
+
+    def count(self, *label_values):
+        entry = self._values.get(label_values)
+        return sum(entry[0]) if entry else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for upper, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if upper == float('inf') else repr(upper)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [('le', le)])} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read when metrics are rendered (e.g. size of the session store), None = not reported."""
+    def __init__(self, name, description, function, kind='gauge'):
+        self.name = name
+        self.description = description
+        self.function = function
+        self.kind = kind
+        _registry.append(self)
+
+    def render(self):
+        value = self.function()
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_value(value)}"]
+
+
+def render():
+    """All registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# metrics of the game server
+REQUEST_SECONDS = Histogram('tictactoe_request_duration_seconds', 'Time of handling HTTP requests.',
+                            ('route', 'method', 'status'))
+AI_MOVE_SECONDS = Histogram('tictactoe_ai_move_duration_seconds', 'Time of choosing the AI move.', ('strategy',))
+QTABLE_LOOKUPS = Counter('tictactoe_qtable_lookups_total',
+                         'AI moves by Q-table lookup result, miss = unknown state answered with a random move.',
+                         ('strategy', 'version', 'result'))
+HISTORY_WRITE_SECONDS = Histogram('tictactoe_history_write_duration_seconds', 'Time of writing one batch of finished games.')
@@ -1,71 +1,14 @@
 import numpy as np
 import random
-import pickle
-import json, os
-import matplotlib.pyplot as plt
-from scipy.interpolate import make_interp_spline
-
-# -----------------------------
-# AUXILIARY FUNCTIONS
-# -----------------------------
-
-# list of tuples representing all moves in TIC TAC TOE game
-ACTIONS = [
-    (0, 0), (0, 1), (0, 2),
-    (1, 0), (1, 1), (1, 2),
-    (2, 0), (2, 1), (2, 2)
-]
-
-#function converting board as array to string to represent state in Q table
-def board_to_string(board):
-    return ''.join(cell if cell is not None else '-' for row in board for cell in row)
-
-# return list of tuples with coordinates of empty cells
-def list_possible_moves(board):
-    possible_moves = []
-
-    for row, col in ACTIONS:
-        if board[row][col] is None:
-            possible_moves.append((row, col))
-    if not possible_moves:
-        return None  # no moves
-
-    return possible_moves
-
-#return tuple with random move
-def random_move(board):
-    possible_moves = list_possible_moves(board)
-
-    if possible_moves is not None:
-        return possible_moves[np.random.randint(len(possible_moves))]
-    else:
-        return None
-
-def is_game_over(board):
-    winning_lines = [
-        [(0, 0), (0, 1), (0, 2)],
-        [(1, 0), (1, 1), (1, 2)],
-        [(2, 0), (2, 1), (2, 2)],
-        [(0, 0), (1, 0), (2, 0)],
-        [(0, 1), (1, 1), (2, 1)],
-        [(0, 2), (1, 2), (2, 2)],
-        [(0, 0), (1, 1), (2, 2)],
-        [(0, 2), (1, 1), (2, 0)]
-    ]
-
-    for line in winning_lines:
-        values = []
-        for (r, c) in line:
-            values.append(board[r][c])
-        if values[0] is not None and values[0] == values[1] and values[1] == values[2]:
-            return True, values[0]
-    if is_board_full(board):            # WIN -> True, winning line
-        return True, 'draw'             # DRAW -> True, 'draw'
-    return False, None                  # STILL PLAYING -> None
-
-def is_board_full(board):
-    return all(element is not None for row in board for element in row)
-
+import json, sys
+import bitboard
+import symmetry
+import batch_training
+import training_metrics
+import training_checkpoint
+# board helpers, loading and trained moves live in inference.py (imported by the server)
+from inference import (ACTIONS, board_to_string, list_possible_moves, random_move, random_move_bits,
+                       is_game_over, is_board_full, save_model, load_model, trained_move, trained_move_bits)
 
 # -----------------------------
 # Q-learning PARAMS
@@ -104,17 +47,22 @@ num_episodes = 500000
 # CHOOSE MOVE
 # -----------------------------
 def choose_action(board, Q_table, exploration_rate):
-    state = board_to_string(board)
+    return choose_action_bits(*bitboard.encode(board), Q_table, exploration_rate)
+
+def choose_action_bits(x_mask, o_mask, Q_table, exploration_rate, rng=None):
+    # rng: random.Random for a reproducible run, by default the global generators are used
+    if (rng or random).uniform(0, 1) < exploration_rate:
+        return random_move_bits(x_mask, o_mask, rng)
 
-    if random.uniform(0, 1) < exploration_rate or state not in Q_table:
-        action = random_move(board)
+    q_values = symmetry.lookup(Q_table, x_mask, o_mask)   # Q values in the orientation of the board
+    if q_values is None:
+        action = random_move_bits(x_mask, o_mask, rng)
     else:
-        q_values = Q_table[state]
-        empty_cells = list_possible_moves(board)
+        empty_cells = bitboard.free_cells(x_mask, o_mask)
         empty_q_values = [q_values[row, col] for (row, col) in empty_cells]
         max_q_value = max(empty_q_values)
         max_q_indices = [i for i in range(len(empty_cells)) if empty_q_values[i] == max_q_value]
-        max_q_index = random.choice(max_q_indices)
+        max_q_index = (rng or random).choice(max_q_indices)
         action = empty_cells[max_q_index]
 
     return action
@@ -128,7 +76,17 @@ def board_next_state(board, cell, player):
 # -----------------------------
 # UPDATE Q
 # -----------------------------
-def update_q_table(Q_table, state, action, next_state, reward):
+def update_q_table(Q_table, state, action, next_state, reward, alpha=None, gamma=None):
+    # alpha, gamma: learning rate and discount factor, the module values above by default
+    alpha = learning_rate if alpha is None else alpha
+    gamma = discount_factor if gamma is None else gamma
+
+    if symmetry.is_canonical(Q_table):
+        # symmetric table keeps only the canonical orientation, the action is rotated with the board
+        state, t = symmetry.canonical_key(state)
+        action = symmetry.to_canonical_action(action, t)
+        next_state, _ = symmetry.canonical_key(next_state)   # max Q value does not depend on orientation
+
     q_values = Q_table.get(state, np.zeros((3, 3))) # Retrieve the Q-values for a particular state from the Q-table dictionary Q.
 
     # Calculate the maximum Q-value for the next state
@@ -136,277 +94,203 @@ def update_q_table(Q_table, state, action, next_state, reward):
     max_next_q_value = np.max(next_q_values)
 
     # Q-learning update equation
-    q_values[action[0], action[1]] += learning_rate * (reward + discount_factor * max_next_q_value - q_values[action[0], action[1]])
+    q_values[action[0], action[1]] += alpha * (reward + gamma * max_next_q_value - q_values[action[0], action[1]])
 
     Q_table[state] = q_values
 
 # -----------------------------
 # TRAINING
 # -----------------------------
-def train_agents(epsilon_min, epsilon_max, decay_rate):
-    Q_attack, Q_defence = {}, {}
-
-    # Inicjalizacja danych do wykresów
-    stats = {
-        "attack": {"wins": [], "draws": [], "losses": []},
-        "defence": {"wins": [], "draws": [], "losses": []}
-    }
-    episodes_checkpoints = []
-    evaluation_games = 1000
-    checkpoint_interval = num_episodes // 10
-
-    # Przygotowanie wykresu
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-    plt.ion()
-    fig.suptitle("Agents learning evaluation vs random enemy")
-
-    # Konfiguracja wykresów
-    axes_config = [
-        (ax1, "Offensive agent (X)", "attack"),
-        (ax2, "Defensive agent (O)", "defence")
-    ]
-
-    colors = {'wins': 'green', 'draws': 'gray', 'losses': 'red'}
-    lines = {}
-
-    for ax, title, agent_type in axes_config:
-        ax.set_title(title)
-        ax.set_xlabel("Episodes")
-        ax.set_ylabel("Result ratio (%)", rotation=0, labelpad=40)
-        ax.grid(alpha=0.3)
-        lines[agent_type] = {}
-        for result_type in ['wins', 'draws', 'losses']:
-            lines[agent_type][result_type], = ax.plot([], [], label=result_type.capitalize(), color=colors[result_type])
-        ax.legend()
-
-    def update_plots():
-        """Aktualizuje dane na wykresach bez pełnego przerysowywania"""
-        x = np.array(episodes_checkpoints)
-
-        for ax, title, agent_type in axes_config:
-            stats_data = stats[agent_type]
-            if len(x) == 0 or len(stats_data["wins"]) == 0:
-                continue
-
-            # Aktualizuj dane linii
-            for result_type in ['wins', 'draws', 'losses']:
-                y_data = stats_data[result_type]
-                min_len = min(len(x), len(y_data))
-                lines[agent_type][result_type].set_data(x[:min_len], y_data[:min_len])
-
-            # Dostosuj zakres osi
-            ax.relim()
-            ax.autoscale_view()
-
-        fig.tight_layout(rect=[0, 0, 1, 0.95])
-        fig.canvas.draw()
-        fig.canvas.flush_events()
-
-    def evaluate_and_record(episode):
-        """Wykonuje ewaluację i zapisuje wyniki"""
-        wins_a, draws_a, losses_a = simulate_games("attack", Q_attack, evaluation_games)
-        wins_d, draws_d, losses_d = simulate_games("defence", Q_defence, evaluation_games)
-
-        # Zapisz wyniki ataku
-        stats["attack"]["wins"].append((wins_a / evaluation_games) * 100)
-        stats["attack"]["draws"].append((draws_a / evaluation_games) * 100)
-        stats["attack"]["losses"].append((losses_a / evaluation_games) * 100)
-
-        # Zapisz wyniki obrony
-        stats["defence"]["wins"].append((wins_d / evaluation_games) * 100)
-        stats["defence"]["draws"].append((draws_d / evaluation_games) * 100)
-        stats["defence"]["losses"].append((losses_d / evaluation_games) * 100)
-
-        episodes_checkpoints.append(episode)
-
-    # Główna pętla treningowa
-    for episode in range(num_episodes):
-        board = np.array([[None, None, None],
-                          [None, None, None],
-                          [None, None, None]])
-
-        current_player = 'X'
-        game_over = False
-        last_moves = {"X": None, "O": None}
+# final reward of each player by the winner
+TERMINAL_REWARDS = {'X': {'X': 1, 'O': -1, 'draw': 0}, 'O': {'X': -1, 'O': 1, 'draw': 1}}
+
+def update_n_step(Q_table, moves, final_reward, ongoing_reward, n_step, alpha=None, gamma=None):
+    # moves: (state, action) of all moves of one player in a finished game, in order
+    # every move is updated towards the rewards of the player's next n_step moves plus the discounted
+    # best Q value of the state n_step moves later (nothing after the end of the game),
+    # from the last move to the first so earlier moves already see the updated later ones
+    gamma = discount_factor if gamma is None else gamma
+    rewards = [ongoing_reward] * (len(moves) - 1) + [final_reward]
+    for k in reversed(range(len(moves))):
+        n_step_return = sum(gamma ** j * reward for j, reward in enumerate(rewards[k:k + n_step]))
+        if k + n_step < len(moves):
+            update_q_table(Q_table, *moves[k], moves[k + n_step][0], n_step_return, alpha, gamma ** n_step)
+        else:
+            update_q_table(Q_table, *moves[k], moves[k][0], n_step_return, alpha, 0)
 
-        # Set exploration rate for this episode
-        exploration_rate = epsilon_min + (epsilon_max - epsilon_min) * np.exp(-decay_rate * episode)
-        # print(exploration_rate)
+def train_episode(Q_attack, Q_defence, exploration_rate, alpha=None, gamma=None, n_step=None, rng=None):
+    """
+        Playing one self-play game and updating both Q-tables after every move (alpha, gamma as in update_q_table),
+        or with n_step at the end of the game towards n-step returns (see update_n_step).
+        rng: random.Random for the moves instead of the global generators.
+        """
+    x_mask, o_mask = 0, 0       # empty board as bitboards
 
-        if episode % checkpoint_interval == 0 or episode == num_episodes - 1:
-            evaluate_and_record(episode)
-            update_plots()
-            plt.pause(0.05)  # Krótsza pauza
+    current_player = 'X'
+    game_over = False
+    last_moves = {"X": None, "O": None}
+    all_moves = {"X": [], "O": []}
 
-        while not game_over:
-            Q = Q_attack if current_player == 'X' else Q_defence
+    while not game_over:
+        Q = Q_attack if current_player == 'X' else Q_defence
 
-            # Choose an action
-            action = choose_action(board, Q, exploration_rate)
-            state_str = board_to_string(board)
-            next_board = board_next_state(board, action, current_player)
-            next_state_str = board_to_string(next_board)
+        # Choose an action
+        action = choose_action_bits(x_mask, o_mask, Q, exploration_rate, rng)
+        state_str = bitboard.state_key(x_mask, o_mask)
 
-            # remember the player's last move
-            last_moves[current_player] = (state_str, action, next_state_str)
+        # Make the chosen move
+        if current_player == 'X':
+            x_mask |= bitboard.cell_bit(*action)
+        else:
+            o_mask |= bitboard.cell_bit(*action)
+        next_state_str = bitboard.state_key(x_mask, o_mask)
 
-            # Make the chosen move
-            row, col = action
-            board[row, col] = current_player
+        # remember the player's last move
+        last_moves[current_player] = (state_str, action, next_state_str)
 
-            # Check if the game is over
-            game_over, winner = is_game_over(board)
+        # Check if the game is over
+        game_over, winner = bitboard.game_result(x_mask, o_mask)
 
+        if n_step:
+            all_moves[current_player].append((state_str, action))
             if game_over:
-                if winner == 'X':
-                    update_q_table(Q_attack, *last_moves['X'], reward=1)
-                    update_q_table(Q_defence, *last_moves['O'], reward=-1)
-                elif winner == 'O':
-                    update_q_table(Q_attack, *last_moves['X'], reward=-1)
-                    update_q_table(Q_defence, *last_moves['O'], reward=1)
-                else:  # draw
-                    update_q_table(Q_attack, *last_moves['X'], reward=0)
-                    update_q_table(Q_defence, *last_moves['O'], reward=1)
-            else:
-                # ongoing reward
-                ongoing_reward = -0.5 if current_player == 'X' else 0
-                update_q_table(Q, state_str, action, next_state_str, ongoing_reward)
+                update_n_step(Q_attack, all_moves['X'], TERMINAL_REWARDS['X'][winner], -0.5, n_step, alpha, gamma)
+                update_n_step(Q_defence, all_moves['O'], TERMINAL_REWARDS['O'][winner], 0, n_step, alpha, gamma)
+        elif game_over:
+            if winner == 'X':
+                update_q_table(Q_attack, *last_moves['X'], reward=1, alpha=alpha, gamma=gamma)
+                update_q_table(Q_defence, *last_moves['O'], reward=-1, alpha=alpha, gamma=gamma)
+            elif winner == 'O':
+                update_q_table(Q_attack, *last_moves['X'], reward=-1, alpha=alpha, gamma=gamma)
+                update_q_table(Q_defence, *last_moves['O'], reward=1, alpha=alpha, gamma=gamma)
+            else:  # draw
+                update_q_table(Q_attack, *last_moves['X'], reward=0, alpha=alpha, gamma=gamma)
+                update_q_table(Q_defence, *last_moves['O'], reward=1, alpha=alpha, gamma=gamma)
+        else:
+            # ongoing reward
+            ongoing_reward = -0.5 if current_player == 'X' else 0
+            update_q_table(Q, state_str, action, next_state_str, ongoing_reward, alpha, gamma)
+
+        current_player = 'O' if current_player == 'X' else 'X'
+
+def train_agents(epsilon_min, epsilon_max, decay_rate, symmetric=False, batched=False, batch_size=4096, metrics_sink=None,
+                 exact_evaluation=True, alpha=None, gamma=None, episodes=None, seed=None,
+                 checkpoint_file=None, resume=False, initial_tables=None, n_step=None):
+    # symmetric=True learns canonical Q-tables, all 8 rotations/reflections of a position share one entry
+    # batched=True plays batch_size games at once as NumPy arrays (see batch_training.py), much faster
+    # metrics_sink receives evaluation results of every checkpoint (see training_metrics.py),
+    # nothing is drawn during training, plots are made from the metrics by plot_training.py
+    # exact_evaluation=True computes checkpoint results exactly (evaluation.exact_outcome),
+    # False plays evaluation_games games against the random opponent
+    # alpha, gamma, episodes: learning rate, discount factor and number of episodes, the module values by default
+    # seed: seed of the random generators, for a reproducible training
+    # checkpoint_file: snapshot of the training saved at every checkpoint (see training_checkpoint.py),
+    # resume=True continues from it, initial_tables=(Q_attack, Q_defence) starts from saved tables instead of empty ones
+    # n_step: update towards n-step returns at the end of every game instead of one-step Q-learning after every move
+    alpha = learning_rate if alpha is None else alpha
+    gamma = discount_factor if gamma is None else gamma
+    episodes = num_episodes if episodes is None else episodes
+    if seed is not None and not batched:
+        random.seed(seed)
+        np.random.seed(seed)
+    if symmetric and batched:
+        raise ValueError("Batched training does not support symmetric Q-tables")
+    if initial_tables is not None:
+        Q_attack, Q_defence = (training_checkpoint.warm_start_table(Q_table, symmetric) for Q_table in initial_tables)
+    elif symmetric:
+        Q_attack, Q_defence = symmetry.SymmetricQTable(), symmetry.SymmetricQTable()
+    else:
+        Q_attack, Q_defence = {}, {}
 
-            current_player = 'O' if current_player == 'X' else 'X'
+    if metrics_sink is None:
+        metrics_sink = training_metrics.RingBufferSink()
+    evaluation_games = 1000
+    checkpoint_interval = max(episodes // 10, 1)
 
-    # WYGŁADZANIE TYLKO PRZY ZAPISIE
-    def smooth_final_plot():
-        """Wygładza wykres tylko dla finalnego zapisu"""
+    config = {"epsilon_min": epsilon_min, "epsilon_max": epsilon_max, "decay_rate": decay_rate, "alpha": alpha,
+              "gamma": gamma, "episodes": episodes, "symmetric": symmetric, "batched": batched,
+              "batch_size": batch_size if batched else None, "n_step": n_step}
+    snapshot = training_checkpoint.load_snapshot(checkpoint_file, config) if checkpoint_file and resume else None
+    # first episode to play, its checkpoint has already been evaluated when resuming
+    first_episode = snapshot["episode"] if snapshot else 0
+    if snapshot:
+        print(f"Resuming training from episode {first_episode} ({checkpoint_file})")
 
-        x_original = np.array(episodes_checkpoints)
+    def save_snapshot(episode, trainer=None):
+        if checkpoint_file:
+            training_checkpoint.save_snapshot(checkpoint_file, config, episode, (Q_attack, Q_defence), trainer)
 
-        for ax, title, agent_type in axes_config:
-            stats_data = stats[agent_type]
-            if len(x_original) < 4:  # Za mało punktów do wygładzenia
+    def evaluate_and_record(episode):
+        """Evaluating both agents and sending the results to the metrics sink"""
+        record = {"episode": episode}
+        for purpose, Q_table in (("attack", Q_attack), ("defence", Q_defence)):
+            if exact_evaluation:
+                from evaluation import exact_outcome
+                win, draw, loss = exact_outcome(purpose, Q_table)
+            else:
+                wins, draws, losses = simulate_games(purpose, Q_table, evaluation_games)
+                win, draw, loss = wins / evaluation_games, draws / evaluation_games, losses / evaluation_games
+            record[purpose] = {
+                "wins": win * 100,
+                "draws": draw * 100,
+                "losses": loss * 100
+            }
+        metrics_sink.write(record)
+
+    if batched:
+        trainer = batch_training.BatchTrainer(alpha, gamma, batch_size, seed, n_step)
+        if snapshot:
+            trainer.set_state(snapshot["trainer"])
+        else:
+            trainer.load('X', Q_attack)
+            trainer.load('O', Q_defence)
+        # the same checkpoints as in the loop below, between them episodes are played in batches
+        checkpoints = sorted(set(range(0, episodes, checkpoint_interval)) | {episodes - 1})
+        for start, end in zip(checkpoints, checkpoints[1:] + [episodes]):
+            if start < first_episode:
                 continue
-
-            for result_type in ['wins', 'draws', 'losses']:
-                y_original = np.array(stats_data[result_type])
-
-                # Tworzymy gęstsze punkty dla płynnego wykresu
-                x_smooth = np.linspace(x_original.min(), x_original.max(), 300)
-
-                # Używamy interpolacji spline
-                spline = make_interp_spline(x_original, y_original, k=3)
-                y_smooth = spline(x_smooth)
-
-                # Aktualizujemy linię wygładzonymi danymi
-                lines[agent_type][result_type].set_data(x_smooth, y_smooth)
-
-            ax.relim()
-            ax.autoscale_view()
-
-        # Na końcu: wygładź i zapisz
-
-    smooth_final_plot()
-    plt.ioff()
-    fig.savefig("training_progress.png", dpi=200, bbox_inches="tight")
-
-    # Dodatkowo: zapisz też wersję z surowymi danymi
-    fig_raw, (ax1_raw, ax2_raw) = plt.subplots(1, 2, figsize=(12, 5))
-    fig_raw.suptitle("Agents learning evaluation vs random enemy (Raw Data)")
-
-    # Rysuj surowe dane na drugim wykresie
-    for ax, title, agent_type in [(ax1_raw, "Offensive agent (X)", "attack"),
-                                  (ax2_raw, "Defensive agent (O)", "defence")]:
-        ax.set_title(title)
-        ax.set_xlabel("Episodes")
-        ax.set_ylabel("Result ratio (%)", rotation=0, labelpad=40)
-        ax.grid(alpha=0.3)
-
-        x = np.array(episodes_checkpoints)
-        stats_data = stats[agent_type]
-        min_len = min(len(x), len(stats_data["wins"]))
-
-        ax.plot(x[:min_len], stats_data["wins"][:min_len], label="Wins", color='green', linewidth=2)
-        ax.plot(x[:min_len], stats_data["draws"][:min_len], label="Draws", color='gray', linewidth=2)
-        ax.plot(x[:min_len], stats_data["losses"][:min_len], label="Losses", color='red', linewidth=2)
-        ax.legend()
-
-    fig_raw.tight_layout(rect=[0, 0, 1, 0.95])
-    fig_raw.savefig("training_progress_raw.png", dpi=200, bbox_inches="tight")
-    plt.close(fig_raw)
+            Q_attack, Q_defence = trainer.view('X'), trainer.view('O')
+            if start != first_episode or not snapshot:
+                evaluate_and_record(start)
+                save_snapshot(start, trainer)
+            trainer.train(start, end, epsilon_min, epsilon_max, decay_rate)
+        if first_episode < episodes:
+            save_snapshot(episodes, trainer)
+        Q_attack, Q_defence = trainer.to_dict('X'), trainer.to_dict('O')
+    else:
+        if snapshot:
+            Q_attack, Q_defence = snapshot["tables"]
+            training_checkpoint.restore_random_state(snapshot)
+        # Główna pętla treningowa
+        for episode in range(first_episode, episodes):
+            # Set exploration rate for this episode
+            exploration_rate = epsilon_min + (epsilon_max - epsilon_min) * np.exp(-decay_rate * episode)
+            # print(exploration_rate)
+
+            if (episode % checkpoint_interval == 0 or episode == episodes - 1) and (episode != first_episode or not snapshot):
+                evaluate_and_record(episode)
+                save_snapshot(episode)
+
+            train_episode(Q_attack, Q_defence, exploration_rate, alpha, gamma, n_step)
+        if first_episode < episodes:
+            save_snapshot(episodes)
 
     return Q_attack, Q_defence
 
-# -----------------------------
-# SAVE AND LOAD
-# -----------------------------
-def save_model(Q_table, filename="q_table.pkl"):
-    try:
-        with open(filename, "wb") as f:
-            pickle.dump(Q_table, f)
-            print(f"Saved a file named: {filename}")
-    except Exception as e:
-        print(f"An error occurred while saving: {e}")
-
-
-def load_model(filename="q_table.pkl"):
-    try:
-        with open(filename, "rb") as f:
-            print(f"File successfully loaded: {filename}!")
-            return pickle.load(f)
-    except FileNotFoundError:
-        print(f"File '{filename}' has not been found.")
-        return None
-    except Exception as e:
-        print(f"An error occurred while loading the model: {e}")
-        return None
-
-# -----------------------------
-# PERFORM TRAINED MOVE
-# -----------------------------
-def trained_move(board, Q_table):
-    """
-        Choosing the best move basen on trained Q-table.
-
-        Args:
-            board (np.array): Current state of board.
-            Q_table (dict): table with Q values,
-
-        Returns:
-            Tuple: (row, col) representing the best move.
-            None: if there are no moves available.
-        """
-    state = board_to_string(board)
-    possible_moves = list_possible_moves(board)
-
-    if not possible_moves:
-        return None
-
-    if state not in Q_table:
-        # print("Unknown state, making a random move.")
-        return random_move(board)
-
-    q_values = Q_table[state]
-
-    # Find the Q values for available moves
-    empty_q_values = [q_values[row, col] for (row, col) in possible_moves]
-    max_q_value = max(empty_q_values)
-
-    # Randomly choose one of all moves with the highest Q value to avoid determinism
-    best_moves_indices = [i for i, q_val in enumerate(empty_q_values) if q_val == max_q_value]
-    best_move_index = random.choice(best_moves_indices)
-
-    return possible_moves[best_move_index]
-
 # -----------------------------
 # PERFORM LEARNING MOVE
 # -----------------------------
 def learning_move(board, Q_table):
     # strategy dependent move and update of Q_table by playing with human player
+    # (games with human players are used for learning offline, in batches, by replay.py)
     pass #return action
 
 
 # -----------------------------
 # EVALUATE MODEL
 # -----------------------------
-def simulate_games(purpose, model, games=1000):
+def simulate_games(purpose, model, games=1000, rng=None):
+    # rng: random.Random for a reproducible run, by default the global generators are used
     wins, draws, losses = 0, 0, 0
     Q_table = model
 
@@ -418,20 +302,23 @@ def simulate_games(purpose, model, games=1000):
         return print("Unknown evaluate purpose, evaluation process breaking...")
 
     for _ in range(games):
-        board = np.array([[None] * 3 for _ in range(3)])
+        x_mask, o_mask = 0, 0
         current_player = 'X'
         game_over = False
         winner = None
 
         while not game_over:
             if current_player == agent_player:  # agent turn
-                move = trained_move(board, Q_table)
+                move = trained_move_bits(x_mask, o_mask, Q_table, rng)
             else:  # random opponent
-                possible = list_possible_moves(board)
-                move = random.choice(possible)
+                possible = bitboard.free_cells(x_mask, o_mask)
+                move = (rng or random).choice(possible)
 
-            board[move] = current_player
-            game_over, winner = is_game_over(board)
+            if current_player == 'X':
+                x_mask |= bitboard.cell_bit(*move)
+            else:
+                o_mask |= bitboard.cell_bit(*move)
+            game_over, winner = bitboard.game_result(x_mask, o_mask)
             current_player = 'O' if current_player == 'X' else 'X'
 
         if winner == agent_player:
@@ -442,31 +329,33 @@ def simulate_games(purpose, model, games=1000):
             losses += 1
     return wins, draws, losses
 
-def evaluate(purpose, model, games=1000):
-    wins, draws, losses = simulate_games(purpose, model, games)
-
-    dane = []
-    filename = 'effectiveness_vs_parameters.json'
-
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            try:
-                dane = json.load(f)
-            except json.JSONDecodeError:
-                dane = []
+EVALUATION_RESULTS_FILE = 'effectiveness_vs_parameters.jsonl'
+
+def evaluate(purpose, model, games=1000, workers=1, seed=None, exact=False, parameters=None, results_file=EVALUATION_RESULTS_FILE):
+    # workers > 1 (or None = all cores) shards the games across processes, see evaluation.py
+    # exact=True computes the exact probabilities instead (wins/draws/losses are then expected counts in games)
+    # parameters: hyperparameters the model was trained with (recorded with the result), the module values by default
+    if exact:
+        from evaluation import exact_outcome
+        wins, draws, losses = (probability * games for probability in exact_outcome(purpose, model))
+    elif workers == 1 and seed is None:
+        wins, draws, losses = simulate_games(purpose, model, games)
+    else:
+        from evaluation import simulate_games_parallel
+        wins, draws, losses = simulate_games_parallel(purpose, model, games, workers, seed or 0)
 
     effectiveness = wins/games*100
     effectiveness_draws = draws/games*100
     loss_ratio = 100 - effectiveness_draws - effectiveness
+    parameters = parameters or {"learning_rate": learning_rate, "discount_factor": discount_factor, "num_episodes": num_episodes,
+                                "epsilon_min": epsilon_min, "epsilon_max": epsilon_max, "decay_rate": decay_rate}
     stats = {"training_purpose": f"{purpose}", "effectiveness": f"{effectiveness:.2f}%", "effectiveness_draws": f"{effectiveness_draws:.2f}%",
                "loss_ratio":f"{loss_ratio:.2f}%", "wins": wins, "draws": draws, "losses": losses,
-               "learning_rate": learning_rate, "discount_factor": discount_factor, "num_episodes": num_episodes,
-               "epsilon_min": epsilon_min, "epsilon_max": epsilon_max, "decay_rate": decay_rate}
-
-    dane.append(stats)
+               **parameters, "evaluation": "exact" if exact else "sampled"}
 
-    with open(filename, 'w') as f:
-        json.dump(dane, f, indent=2)
+    # one JSON line appended per evaluation, the results of earlier runs are never read or rewritten
+    with open(results_file, 'a') as f:
+        f.write(json.dumps(stats) + '\n')
 
     print("--------------------------------------------------------------------")
     print(f"PURPOSE: {purpose}")
@@ -479,16 +368,35 @@ def evaluate(purpose, model, games=1000):
 
 # RUN MODEL
 if __name__ == "__main__":
+    batched = "--batched" in sys.argv      # python model.py --batched
+    headless = "--headless" in sys.argv    # only training_metrics.jsonl, no plots (no matplotlib needed)
+    sampled = "--sampled" in sys.argv      # checkpoints and final evaluation by playing games instead of exact results
+    resume = "--resume" in sys.argv        # continue an interrupted training from training_checkpoint.pkl
+    warm_start = "--warm-start" in sys.argv    # start from q_table_A_best.pkl / q_table_D_best.pkl instead of empty tables
+    # --n-step N: updates towards N-step returns instead of one-step Q-learning (see update_n_step)
+    n_step = int(sys.argv[sys.argv.index("--n-step") + 1]) if "--n-step" in sys.argv else None
     print("Loading trained model...")
     Qa = load_model("q_table_A.pkl")
     Qd = load_model("q_table_D.pkl")
     if (Qa or Qd) is None:
         print("Agents Training...")
-        Qa, Qd = train_agents(epsilon_min, epsilon_max, decay_rate)
+        initial_tables = None
+        if warm_start:
+            initial_tables = (load_model("q_table_A_best.pkl"), load_model("q_table_D_best.pkl"))
+            if None in initial_tables:
+                sys.exit("--warm-start needs q_table_A_best.pkl and q_table_D_best.pkl")
+        sink = training_metrics.JsonlMetricsSink("training_metrics.jsonl", append=resume)
+        Qa, Qd = train_agents(epsilon_min, epsilon_max, decay_rate, batched=batched, metrics_sink=sink,
+                              exact_evaluation=not sampled, checkpoint_file=training_checkpoint.DEFAULT_CHECKPOINT,
+                              resume=resume, initial_tables=initial_tables, n_step=n_step)
+        sink.close()
+        if not headless:
+            from plot_training import plot_from_file
+            plot_from_file("training_metrics.jsonl")
         save_model(Qa, "q_table_A.pkl")
         save_model(Qd, "q_table_D.pkl")
-        evaluate("attack", Qa, 10000)
-        evaluate("defence", Qd, 10000)
+        evaluate("attack", Qa, 10000, exact=not sampled)
+        evaluate("defence", Qd, 10000, exact=not sampled)
 
 
 
@@ -0,0 +1,63 @@
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.interpolate import make_interp_spline
+from training_metrics import read_metrics
+
+# -----------------------------
+# TRAINING PLOTS (OFFLINE)
+# -----------------------------
+# Drawing training_progress.png (smoothed) and training_progress_raw.png from the
+# metrics written during training:  python plot_training.py training_metrics.jsonl
+
+AXES_CONFIG = [
+    ("Offensive agent (X)", "attack"),
+    ("Defensive agent (O)", "defence")
+]
+COLORS = {'wins': 'green', 'draws': 'gray', 'losses': 'red'}
+
+
+def _draw(records, title, smooth):
+    x_original = np.array([record['episode'] for record in records])
+
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    fig.suptitle(title)
+
+    for ax, (agent_title, agent_type) in zip(axes, AXES_CONFIG):
+        ax.set_title(agent_title)
+        ax.set_xlabel("Episodes")
+        ax.set_ylabel("Result ratio (%)", rotation=0, labelpad=40)
+        ax.grid(alpha=0.3)
+
+        for result_type in ['wins', 'draws', 'losses']:
+            y_original = np.array([record[agent_type][result_type] for record in records])
+            x, y = x_original, y_original
+            if smooth and len(x_original) >= 4:     # Za mało punktów do wygładzenia
+                # Tworzymy gęstsze punkty dla płynnego wykresu, interpolacja spline
+                x = np.linspace(x_original.min(), x_original.max(), 300)
+                y = make_interp_spline(x_original, y_original, k=3)(x)
+            ax.plot(x, y, label=result_type.capitalize(), color=COLORS[result_type],
+                    linewidth=1.5 if smooth else 2)
+        ax.legend()
+
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+    return fig
+
+
+def plot_training(records, smooth_file="training_progress.png", raw_file="training_progress_raw.png"):
+    fig = _draw(records, "Agents learning evaluation vs random enemy", smooth=True)
+    fig.savefig(smooth_file, dpi=200, bbox_inches="tight")
+    plt.close(fig)
+
+    fig_raw = _draw(records, "Agents learning evaluation vs random enemy (Raw Data)", smooth=False)
+    fig_raw.savefig(raw_file, dpi=200, bbox_inches="tight")
+    plt.close(fig_raw)
+    print(f"Saved plots: {smooth_file}, {raw_file}")
+
+
+def plot_from_file(filename="training_metrics.jsonl", smooth_file="training_progress.png", raw_file="training_progress_raw.png"):
+    plot_training(read_metrics(filename), smooth_file, raw_file)
+
+
+if __name__ == "__main__":
+    plot_from_file(*sys.argv[1:2])
@@ -0,0 +1,108 @@
+import os
+import random
+import sys
+import numpy as np
+import bitboard
+import qtable
+import symmetry
+
+# -----------------------------
+# COMPILED POLICY
+# -----------------------------
+# Q-tables do not change while the server runs, so the best moves of every state can be
+# found once. A compiled policy keeps, for every base-3 state id, a 9-bit mask of the
+# legal moves with the highest Q value (0 = state unknown to the Q-table).
+# Choosing a move is then one tuple lookup and, for ties, one random choice.
+
+# move mask -> tuple of (row, col) moves in the mask
+MASK_MOVES = tuple(tuple(cell for i, cell in enumerate(bitboard.CELLS) if mask >> i & 1) for mask in range(512))
+
+TIE_BREAKS = ('random', 'first')
+
+
+def best_moves_mask(q_values, x_mask, o_mask):
+    # same choice as trained_move: all legal moves with the highest Q value
+    possible_moves = bitboard.free_cells(x_mask, o_mask)
+    empty_q_values = [q_values[row, col] for (row, col) in possible_moves]
+    max_q_value = max(empty_q_values)
+    mask = 0
+    for (row, col), q_val in zip(possible_moves, empty_q_values):
+        if q_val == max_q_value:
+            mask |= bitboard.cell_bit(row, col)
+    return mask
+
+
+def compile_policy(Q_table):
+    """
+        Compiling Q-table (dict, symmetry.SymmetricQTable or qtable.DenseQTable) to the array of best moves.
+
+        Returns:
+            np.array: uint16 array (19683,), state id -> mask of the best moves, 0 if unknown.
+        """
+    best = np.zeros(bitboard.NUM_STATES, dtype=np.uint16)
+    # canonical tables are expanded to every orientation, so serving needs no canonicalization
+    items = symmetry.expand(Q_table) if symmetry.is_canonical(Q_table) else Q_table.items()
+    for state, q_values in items:
+        x_mask, o_mask = bitboard.from_key(state)
+        if bitboard.free_cells(x_mask, o_mask) and not bitboard.game_result(x_mask, o_mask)[0]:
+            best[bitboard.state_id(x_mask, o_mask)] = best_moves_mask(q_values, x_mask, o_mask)
+    return best
+
+
+class Policy:
+    """
+        Serving-time policy built from a compiled best-moves array.
+
+        Args:
+            best (np.array): output of compile_policy.
+            tie_break (str): 'random' - random move among the best ones (like trained_move),
+                             'first' - always the first of them (deterministic).
+            seed (int): seed of the random generator used for ties and unknown states.
+        """
+    def __init__(self, best, tie_break='random', seed=None):
+        if tie_break not in TIE_BREAKS:
+            raise ValueError(f"Unknown tie break: {tie_break}")
+        self.tie_break = tie_break
+        self._rng = random.Random(seed)
+        # state id -> tuple of best moves (None for unknown states), built once
+        self._moves = tuple(MASK_MOVES[mask] if mask else None for mask in best.tolist())
+        self.states = int(np.count_nonzero(best))
+
+    def knows(self, x_mask, o_mask):
+        return self._moves[bitboard.state_id(x_mask, o_mask)] is not None
+
+    def move(self, x_mask, o_mask):
+        """Same contract as trained_move: (row, col) or None if there are no moves."""
+        moves = self._moves[bitboard.state_id(x_mask, o_mask)]
+        if moves is None:
+            # unknown state, making a random move
+            possible_moves = bitboard.free_cells(x_mask, o_mask)
+            return self._rng.choice(possible_moves) if possible_moves else None
+        if self.tie_break == 'first' or len(moves) == 1:
+            return moves[0]
+        return self._rng.choice(moves)
+
+
+def policy_file(model_filename):
+    return qtable.dense_prefix(model_filename) + '.policy.npy'
+
+
+def load_policy(model_filename, Q_table, tie_break='random', seed=None):
+    """Using the policy compiled offline for model_filename if it is up to date, otherwise compiling it now."""
+    filename = policy_file(model_filename)
+    if os.path.exists(filename) and os.path.getmtime(filename) >= max(
+            (os.path.getmtime(f) for f in [model_filename, *qtable.table_files(qtable.dense_prefix(model_filename))]
+             if os.path.exists(f)), default=0):
+        best = np.load(filename)
+    else:
+        best = compile_policy(Q_table)
+    return Policy(best, tie_break, seed)
+
+
+if __name__ == "__main__":
+    # python policy.py q_table_A_best.pkl q_table_D_best.pkl
+    from inference import load_model
+    for model_filename in sys.argv[1:] or ["q_table_A_best.pkl", "q_table_D_best.pkl"]:
+        best = compile_policy(load_model(model_filename))
+        np.save(policy_file(model_filename), best)
+        print(f"Saved a compiled policy: {policy_file(model_filename)} ({np.count_nonzero(best)} states)")
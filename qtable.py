@@ -0,0 +1,126 @@
+import json
+import os
+import pickle
+import sys
+import numpy as np
+import bitboard
+
+# -----------------------------
+# DENSE Q-TABLE FORMAT
+# -----------------------------
+# Q-table saved as:
+#   <prefix>.qvalues.npy - float32 array (states x 9), one row of Q values per known state
+#   <prefix>.qindex.npy  - int16 array (19683,), base-3 state id -> row in qvalues, -1 = unknown state
+#   <prefix>.qmeta.json  - small description of the table (format, number of states, source,
+#                          canonical - states are stored only in their canonical orientation, see symmetry.py)
+# Both arrays are loaded with mmap_mode='r', so all worker processes share the same memory pages.
+
+FORMAT_VERSION = 1
+MISSING = -1
+
+
+def table_files(prefix):
+    return prefix + '.qvalues.npy', prefix + '.qindex.npy', prefix + '.qmeta.json'
+
+def dense_prefix(filename):
+    # 'q_table_A_best.pkl' -> 'q_table_A_best'
+    return filename[:-len('.pkl')] if filename.endswith('.pkl') else filename
+
+def exists(prefix):
+    values_file, index_file, _ = table_files(prefix)
+    return os.path.exists(values_file) and os.path.exists(index_file)
+
+
+class DenseQTable:
+    """
+        Q-table backed by one contiguous array, with the same interface as the dict
+        used in training (Q_table[state_string] -> 3x3 Q values), so it works with trained_move.
+        """
+    def __init__(self, values, index, meta=None):
+        self.values = values
+        self.index = index
+        self.meta = meta or {}
+        self.canonical = self.meta.get("canonical", False)
+
+    def row(self, x_mask, o_mask):
+        # row number of the state or -1 if the state is not in the table
+        return int(self.index[bitboard.state_id(x_mask, o_mask)])
+
+    def _row(self, state):
+        return int(self.index[bitboard.state_id(*bitboard.from_key(state))])
+
+    def __contains__(self, state):
+        return self._row(state) != MISSING
+
+    def __getitem__(self, state):
+        row = self._row(state)
+        if row == MISSING:
+            raise KeyError(state)
+        return self.values[row].reshape(3, 3)
+
+    def get(self, state, default=None):
+        row = self._row(state)
+        return default if row == MISSING else self.values[row].reshape(3, 3)
+
+    def __len__(self):
+        return len(self.values)
+
+    def keys(self):
+        return (bitboard.STATE_KEYS[sid] for sid in np.flatnonzero(self.index != MISSING))
+
+    __iter__ = keys
+
+    def items(self):
+        return ((bitboard.STATE_KEYS[sid], self.values[row].reshape(3, 3))
+                for sid, row in zip(np.flatnonzero(self.index != MISSING), self.index[self.index != MISSING]))
+
+
+def to_dense(Q_table):
+    """Converting dict Q-table (state string -> 3x3 array) to (values, index) arrays."""
+    index = np.full(bitboard.NUM_STATES, MISSING, dtype=np.int16)
+    values = np.zeros((len(Q_table), 9), dtype=np.float32)
+    for row, (state, q_values) in enumerate(Q_table.items()):
+        index[bitboard.state_id(*bitboard.from_key(state))] = row
+        values[row] = np.asarray(q_values, dtype=np.float32).reshape(9)
+    return values, index
+
+
+def save_dense(Q_table, prefix, source=None):
+    values, index = to_dense(Q_table)
+    values_file, index_file, meta_file = table_files(prefix)
+    np.save(values_file, values)
+    np.save(index_file, index)
+    meta = {"format": FORMAT_VERSION, "states": len(values), "source": source,
+            "canonical": getattr(Q_table, "canonical", False)}
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent=2)
+    print(f"Saved a dense Q-table: {values_file}, {index_file}")
+    return meta
+
+
+def load_dense(prefix, mmap=True):
+    values_file, index_file, meta_file = table_files(prefix)
+    mmap_mode = 'r' if mmap else None
+    values = np.load(values_file, mmap_mode=mmap_mode)
+    index = np.load(index_file, mmap_mode=mmap_mode)
+    if values.ndim != 2 or values.shape[1] != 9 or index.shape != (bitboard.NUM_STATES,):
+        raise ValueError(f"Dense Q-table '{prefix}' has wrong shape: {values.shape}, {index.shape}")
+
+    meta = {}
+    if os.path.exists(meta_file):
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+    return DenseQTable(values, index, meta)
+
+
+def convert_pickle(filename, prefix=None):
+    """Converting pickled dict Q-table (e.g. q_table_A_best.pkl) to the dense format next to it."""
+    with open(filename, 'rb') as f:
+        Q_table = pickle.load(f)
+    return save_dense(Q_table, prefix or dense_prefix(filename), source=os.path.basename(filename))
+
+
+if __name__ == "__main__":
+    # python qtable.py q_table_A_best.pkl q_table_D_best.pkl
+    for pickle_file in sys.argv[1:] or ["q_table_A_best.pkl", "q_table_D_best.pkl"]:
+        convert_pickle(pickle_file)
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+import analysis
+import policy
+import qtable
+from inference import load_model
+
+# -----------------------------
+# MODEL REGISTRY
+# -----------------------------
+# Keeps the served model of every strategy as an immutable ModelVersion (Q-table + compiled
+# policy + version). A new table is loaded, validated and compiled next to the old one and only
+# then swapped in with a single assignment, so requests already holding the old version finish
+# with it and no request ever sees a half-loaded model. A table that fails to load or validate
+# is rejected and the old version keeps serving. Reloading is triggered by reload(), SIGHUP
+# or watch(), which checks the model files for changes.
+
+
+class ModelVersion:
+    def __init__(self, strategy, filename, version, Q_table, ai_policy):
+        self.strategy = strategy
+        self.filename = filename
+        self.version = version
+        self.Q_table = Q_table
+        self.policy = ai_policy
+        self.loaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._q_arrays = None
+
+    def q_arrays(self):
+        """Dense Q values of the table for batch analysis (analysis.q_arrays), built on first use, None without a Q-table."""
+        if self.Q_table is None:
+            return None
+        if self._q_arrays is None:
+            self._q_arrays = analysis.q_arrays(self.Q_table)
+        return self._q_arrays
+
+    def describe(self):
+        return {"strategy": self.strategy, "filename": self.filename, "version": self.version,
+                "states": len(self.Q_table) if self.Q_table is not None else None,
+                "policy_states": self.policy.states, "loaded_at": self.loaded_at}
+
+
+def model_files(filename):
+    """Files the model of filename is loaded from (pickle and/or dense Q-table)."""
+    prefix = qtable.dense_prefix(filename)
+    return [f for f in (filename, *qtable.table_files(prefix)) if os.path.exists(f)]
+
+
+def file_version(filename):
+    """Version of a model: beginning of the SHA-256 of its files, the same table has the same version everywhere."""
+    digest = hashlib.sha256()
+    for f in model_files(filename):
+        with open(f, 'rb') as model_file:
+            for block in iter(lambda: model_file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def validate(Q_table, filename):
+    if Q_table is None:
+        raise ValueError(f"Model {filename} could not be loaded")
+    if len(Q_table) == 0:
+        raise ValueError(f"Model {filename} is empty")
+    for state, q_values in Q_table.items():
+        q_values = np.asarray(q_values)
+        if q_values.size != 9 or not np.all(np.isfinite(q_values)):
+            raise ValueError(f"Model {filename} has invalid Q values in state {state}")
+
+
+class ModelRegistry:
+    """
+        Served models of all strategies.
+
+        Args:
+            tie_break (str), seed (int): passed to the compiled policies (see policy.Policy).
+        """
+    def __init__(self, tie_break='random', seed=None):
+        self.tie_break = tie_break
+        self.seed = seed
+        self._models = {}       # strategy -> ModelVersion, replaced as a whole, never changed
+        self._files = {}        # strategy -> model filename
+        self._signatures = {}   # strategy -> (mtime, size) of model files at the last load
+        self.errors = {}        # strategy -> error of the last failed load
+        self._reload_lock = threading.Lock()
+
+    def register(self, strategy, filename=None, ai_policy=None, version=None):
+        """
+            Adding a strategy served from a Q-table file (loaded now) or a fixed policy
+            (e.g. the perfect play from solver.py). A failed load is reported in errors.
+            """
+        if ai_policy is not None:
+            self._models[strategy] = ModelVersion(strategy, None, version or 'builtin', None, ai_policy)
+            return self._models[strategy]
+        self._files[strategy] = filename
+        return self.reload(strategy)
+
+    def get(self, strategy):
+        """Current ModelVersion of the strategy or None if it has no valid model."""
+        return self._models.get(strategy)
+
+    def _signature(self, filename):
+        return tuple((os.path.getmtime(f), os.path.getsize(f)) for f in model_files(filename))
+
+    def _load(self, strategy, filename):
+        signature = self._signature(filename)
+        Q_table = load_model(filename)
+        validate(Q_table, filename)
+        ai_policy = policy.load_policy(filename, Q_table, self.tie_break, self.seed)
+        if ai_policy.states == 0:
+            raise ValueError(f"Model {filename} does not know any position")
+        return ModelVersion(strategy, filename, file_version(filename), Q_table, ai_policy), signature
+
+    def reload(self, strategy=None):
+        """
+            Loading, validating and compiling the model of the strategy (all file-based strategies
+            if None) and swapping it in. The old version stays when the new one is not valid.
+
+            Returns:
+                ModelVersion of the (last) reloaded strategy or None if it failed.
+            """
+        result = None
+        with self._reload_lock:
+            for name in [strategy] if strategy else list(self._files):
+                filename = self._files[name]
+                try:
+                    model_version, signature = self._load(name, filename)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    print(f"Model {filename} rejected, {name} keeps version "
+                          f"{self._models[name].version if name in self._models else None}: {e}")
+                    result = None
+                    continue
+                self._models[name] = model_version     # atomic swap
+                self._signatures[name] = signature
+                self.errors.pop(name, None)
+                result = model_version
+        return result
+
+    def reload_async(self, strategy=None):
+        thread = threading.Thread(target=self.reload, args=(strategy,), name='model-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def changed(self):
+        """File-based strategies whose model files changed since they were loaded."""
+        return [name for name, filename in self._files.items()
+                if self._signature(filename) != self._signatures.get(name)]
+
+    def watch(self, interval=10.0):
+        """Checking the model files every interval seconds in a background thread and reloading changed ones."""
+        def run():
+            while True:
+                time.sleep(interval)
+                for name in self.changed():
+                    self.reload(name)
+        thread = threading.Thread(target=run, name='model-watch', daemon=True)
+        thread.start()
+        return thread
+
+    def reload_on_signal(self, signum=getattr(signal, 'SIGHUP', None)):
+        """Reloading all models in the background on SIGHUP (only possible in the main thread, not on Windows)."""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.reload_async())
+        return True
+
+    def describe(self):
+        return {"models": {name: model_version.describe() for name, model_version in self._models.items()},
+                "errors": dict(self.errors)}
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import pickle
+from collections import Counter
+import numpy as np
+import bitboard
+import history
+import model
+from batch_training import BatchTrainer, ONGOING_REWARD
+from training_checkpoint import save_atomic
+
+# -----------------------------
+# OFFLINE TRAINING FROM RECORDED GAMES
+# -----------------------------
+# Games played on the server are streamed from the history store and turned into the same
+# Q-learning transitions self-play makes in model.train_episode (X moves update the attack
+# table, O moves the defence table). Identical transitions are merged and applied as one
+# batched update (batch_training.BatchTrainer.update), one chunk of games at a time. After every
+# chunk the tables and a checkpoint with the id of the last used game are saved, so the next
+# run (e.g. a nightly job) continues with the games played since then.
+#   python replay.py
+#   python replay.py --attack q_table_A_best.pkl --attack-out q_table_A_best.pkl   # update in place
+
+DEFAULT_CHECKPOINT = 'replay_checkpoint.json'
+
+# winner -> (reward of X's last move, reward of O's last move), as in model.train_episode
+TERMINAL_REWARDS = {'X': (1, -1), 'O': (-1, 1), 'draw': (0, 1)}
+
+
+def game_transitions(record):
+    """
+        Generator of (player, state id, action 0-8, next state id, reward) of one recorded game.
+        Games with an illegal move log (occupied cell, moves after the end) raise ValueError.
+        """
+    x_mask = o_mask = 0
+    last_moves = {'X': None, 'O': None}
+    cells = history.move_cells(record.get("moves", ()))
+    for i, cell in enumerate(cells):
+        if not (0 <= cell < 9) or (x_mask | o_mask) >> cell & 1:
+            raise ValueError(f"Illegal move {cell} in game {record.get('id')}")
+        player = 'X' if i % 2 == 0 else 'O'
+        sid = bitboard.state_id(x_mask, o_mask)
+        if player == 'X':
+            x_mask |= 1 << cell
+        else:
+            o_mask |= 1 << cell
+        next_sid = bitboard.state_id(x_mask, o_mask)
+        last_moves[player] = (sid, cell, next_sid)
+
+        game_over, winner = bitboard.game_result(x_mask, o_mask)
+        if game_over:
+            if i != len(cells) - 1:
+                raise ValueError(f"Moves after the end of game {record.get('id')}")
+            reward_x, reward_o = TERMINAL_REWARDS[winner]
+            yield ('X', *last_moves['X'], reward_x)
+            if last_moves['O'] is not None:
+                yield ('O', *last_moves['O'], reward_o)
+        else:
+            yield (player, sid, cell, next_sid, ONGOING_REWARD[player])
+
+
+def apply_transitions(trainer, transitions):
+    """Applying Counter of transitions -> number of occurrences as one batched update per player."""
+    for player in ('X', 'O'):
+        items = [(transition, count) for transition, count in transitions.items() if transition[0] == player]
+        if not items:
+            continue
+        columns = np.array([transition[1:] for transition, _ in items], dtype=float)
+        trainer.update(player, columns[:, 0].astype(np.int64), columns[:, 1].astype(np.int64),
+                       columns[:, 2].astype(np.int64), columns[:, 3], [count for _, count in items])
+
+
+def load_checkpoint(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def replay(writer=None, attack='q_table_A_best.pkl', defence='q_table_D_best.pkl',
+           attack_out='q_table_A_replay.pkl', defence_out='q_table_D_replay.pkl',
+           checkpoint_file=DEFAULT_CHECKPOINT, chunk_size=10000, learning_rate=None, discount_factor=None):
+    """
+        Training the tables on recorded games not used yet.
+
+        The tables are read from attack/defence on the first run and from attack_out/defence_out
+        when a checkpoint exists (they already contain the games used before).
+
+        Returns:
+            dict: the checkpoint - last used game id and totals of games, skipped games and transitions.
+        """
+    writer = writer or history.create_writer(background=False)
+    checkpoint = load_checkpoint(checkpoint_file)
+    resume = bool(checkpoint) and os.path.exists(attack_out) and os.path.exists(defence_out)
+    if not resume:
+        checkpoint = {"last_game_id": 0, "games": 0, "skipped": 0, "transitions": 0}
+
+    trainer = BatchTrainer(learning_rate if learning_rate is not None else model.learning_rate,
+                           discount_factor if discount_factor is not None else model.discount_factor)
+    for player, filename in (('X', attack_out if resume else attack), ('O', defence_out if resume else defence)):
+        Q_table = model.load_model(filename)
+        if Q_table is not None:
+            trainer.load(player, Q_table)
+
+    def save(transitions):
+        apply_transitions(trainer, transitions)
+        checkpoint["transitions"] += sum(transitions.values())
+        # tables first, the checkpoint last: after a crash in between the chunk is used once more
+        for player, filename in (('X', attack_out), ('O', defence_out)):
+            save_atomic(filename, lambda f: pickle.dump(trainer.to_dict(player), f))
+        save_atomic(checkpoint_file, lambda f: f.write(json.dumps(checkpoint, indent=2).encode()))
+        print(f"Replayed games up to {checkpoint['last_game_id']} ({len(transitions)} unique transitions)")
+
+    transitions, games_in_chunk = Counter(), 0
+    for record in writer.export(after_id=checkpoint["last_game_id"]):
+        try:
+            # the whole game is checked before anything is counted, a malformed game adds nothing
+            transitions.update(list(game_transitions(record)))
+            checkpoint["games"] += 1
+        except ValueError as e:
+            print(f"Skipping a game: {e}")
+            checkpoint["skipped"] += 1
+        checkpoint["last_game_id"] = record["id"]
+        games_in_chunk += 1
+        if games_in_chunk >= chunk_size:
+            save(transitions)
+            transitions, games_in_chunk = Counter(), 0
+    if games_in_chunk:
+        save(transitions)
+    return checkpoint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training the agents on games recorded in the history.")
+    parser.add_argument("--attack", default="q_table_A_best.pkl", help="attack table used on the first run")
+    parser.add_argument("--defence", default="q_table_D_best.pkl", help="defence table used on the first run")
+    parser.add_argument("--attack-out", default="q_table_A_replay.pkl")
+    parser.add_argument("--defence-out", default="q_table_D_replay.pkl")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="games per batched update and checkpoint")
+    args = parser.parse_args()
+
+    result = replay(attack=args.attack, defence=args.defence, attack_out=args.attack_out,
+                    defence_out=args.defence_out, checkpoint_file=args.checkpoint, chunk_size=args.chunk_size)
+    print(json.dumps(result, indent=2))
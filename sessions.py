@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from game import Game
+
+# -----------------------------
+# GAME SESSION STORE
+# -----------------------------
+# Games of all players, key = session_id, value = Game object. Stores are bounded:
+#   - idle_ttl: a game not used for idle_ttl seconds expires,
+#   - max_size: when full, the least recently used game is evicted.
+# MemorySessionStore keeps Game objects in the process, SQLiteSessionStore keeps a compact
+# state of every game (Game.to_state) in a file shared by all worker processes.
+
+
+class SessionStore:
+    def __init__(self, max_size=10000, idle_ttl=3600):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.evictions = 0      # games removed because the store was full
+        self.expirations = 0    # games removed after idle_ttl
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Game of the session or None if it does not exist or has expired."""
+        raise NotImplementedError
+
+    def save(self, session_id, game):
+        """Storing a new or changed game, has to be called after every change of the game."""
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"size": len(self), "max_size": self.max_size, "idle_ttl": self.idle_ttl,
+                "evictions": self.evictions, "expirations": self.expirations}
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_size=10000, idle_ttl=3600):
+        super().__init__(max_size, idle_ttl)
+        self._games = OrderedDict()     # session_id -> (Game, last use), least recently used first
+
+    def _expire(self, now):
+        # the least recently used games are at the front, so only expired ones are visited
+        while self._games:
+            session_id, (_, last_used) = next(iter(self._games.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            del self._games[session_id]
+            self.expirations += 1
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._games.get(session_id)
+            if entry is None:
+                return None
+            self._games[session_id] = (entry[0], now)
+            self._games.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id, game):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._games[session_id] = (game, now)
+            self._games.move_to_end(session_id)
+            while len(self._games) > self.max_size:
+                self._games.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._games.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._games)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite file (WAL mode), so a game can be continued by any worker process."""
+    def __init__(self, filename='sessions.sqlite3', max_size=10000, idle_ttl=3600):
+        super().__init__(max_size, idle_ttl)
+        self.filename = filename
+        self._conn = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state TEXT NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+        self._conn.commit()
+
+    def _expire(self, now):
+        removed = self._conn.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.idle_ttl,)).rowcount
+        self.expirations += removed
+
+    def get(self, session_id):
+        now = time.time()   # wall clock, shared by all processes
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT state, last_used FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.idle_ttl:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self.expirations += 1
+                return None
+            self._conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+        return Game.from_state(json.loads(row[0]))
+
+    def save(self, session_id, game):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sessions (id, state, last_used) VALUES (?, ?, ?)",
+                               (session_id, json.dumps(game.to_state(), separators=(',', ':')), now))
+            self._expire(now)
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            if size > self.max_size:
+                self.evictions += self._conn.execute(
+                    "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_used LIMIT ?)",
+                    (size - self.max_size,)).rowcount
+
+    def delete(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_store(backend=None, filename=None, max_size=None, idle_ttl=None):
+    """
+        Creating session store, values not given are read from environment variables:
+        SESSION_BACKEND (memory/sqlite), SESSION_FILE, SESSION_MAX_SIZE, SESSION_IDLE_TTL (seconds).
+        """
+    backend = backend or os.environ.get('SESSION_BACKEND', 'memory')
+    max_size = max_size if max_size is not None else int(os.environ.get('SESSION_MAX_SIZE', '10000'))
+    idle_ttl = idle_ttl if idle_ttl is not None else float(os.environ.get('SESSION_IDLE_TTL', '3600'))
+
+    if backend == 'memory':
+        return MemorySessionStore(max_size, idle_ttl)
+    elif backend == 'sqlite':
+        return SQLiteSessionStore(filename or os.environ.get('SESSION_FILE', 'sessions.sqlite3'), max_size, idle_ttl)
+    else:
+        raise ValueError(f"Unknown session backend: {backend}")
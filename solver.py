@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import numpy as np
+import bitboard
+import policy
+
+# -----------------------------
+# PERFECT PLAY SOLVER
+# -----------------------------
+# Negamax with alpha-beta pruning and a transposition table solves every reachable position
+# (5478 of them) in well under a second. Scores are given for the player to move:
+#   win = 1 + number of empty cells left after the winning move (faster wins score more),
+#   draw = 0, loss = the negative of the opponent's win.
+# The solution is compiled to the same best-moves array as a Q-table (see policy.py), so the
+# "perfect" strategy answers a move with one tuple lookup, and it is used as an oracle to
+# check how often the moves of a Q-table are optimal.
+
+PERFECT_POLICY_FILE = 'perfect.policy.npy'
+INFINITY = 100
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def _free_bits(occupied):
+    return [1 << i for i in range(9) if not occupied >> i & 1]
+
+FREE_BITS = tuple(_free_bits(occupied) for occupied in range(512))
+
+
+def _negamax(me, opponent, alpha, beta, table):
+    # me - mask of the player to move, opponent - mask of the player who has just moved
+    if bitboard.WINNING_LINE[opponent]:
+        return -(10 - (me | opponent).bit_count())
+    free = FREE_BITS[me | opponent]
+    if not free:
+        return 0
+
+    key = me << 9 | opponent
+    entry = table.get(key)
+    if entry is not None:
+        value, flag = entry
+        if flag == EXACT:
+            return value
+        if flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value
+
+    original_alpha = alpha
+    best = -INFINITY
+    for bit in free:
+        value = -_negamax(opponent, me | bit, -beta, -alpha, table)
+        if value > best:
+            best = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+
+    flag = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+    table[key] = (best, flag)
+    return best
+
+
+def _mover_masks(x_mask, o_mask):
+    # X moves when both players have made the same number of moves
+    if x_mask.bit_count() == o_mask.bit_count():
+        return x_mask, o_mask
+    return o_mask, x_mask
+
+
+def score(x_mask, o_mask, table=None):
+    """Score of the position for the player to move (positive = win, 0 = draw, negative = loss)."""
+    return _negamax(*_mover_masks(x_mask, o_mask), -INFINITY, INFINITY, {} if table is None else table)
+
+
+class Solution:
+    """
+        Solved game, all arrays are indexed by the base-3 state id (bitboard.state_id), 0 for
+        unreachable and finished positions.
+
+        Attributes:
+            values (np.array): int8, score of the position for the player to move.
+            best (np.array): uint16 mask of the moves with the highest score (fastest win, slowest loss).
+            optimal (np.array): uint16 mask of the moves keeping the game-theoretic result (win/draw/loss).
+            reachable (np.array): bool, positions reachable from the empty board (finished ones included).
+        """
+    def __init__(self, values, best, optimal, reachable):
+        self.values = values
+        self.best = best
+        self.optimal = optimal
+        self.reachable = reachable
+
+
+def solve():
+    table = {}
+    values = np.zeros(bitboard.NUM_STATES, dtype=np.int8)
+    best = np.zeros(bitboard.NUM_STATES, dtype=np.uint16)
+    optimal = np.zeros(bitboard.NUM_STATES, dtype=np.uint16)
+    reachable = np.zeros(bitboard.NUM_STATES, dtype=bool)
+
+    stack = [(0, 0)]
+    reachable[0] = True
+    while stack:
+        x_mask, o_mask = stack.pop()
+        if bitboard.game_result(x_mask, o_mask)[0]:
+            continue
+        me, opponent = _mover_masks(x_mask, o_mask)
+        children = {bit: -_negamax(opponent, me | bit, -INFINITY, INFINITY, table)
+                    for bit in FREE_BITS[x_mask | o_mask]}
+        top = max(children.values())
+        sid = bitboard.state_id(x_mask, o_mask)
+        values[sid] = top
+        best[sid] = sum(bit for bit, value in children.items() if value == top)
+        optimal[sid] = sum(bit for bit, value in children.items() if np.sign(value) == np.sign(top))
+
+        for bit in children:
+            child = (x_mask | bit, o_mask) if me == x_mask else (x_mask, o_mask | bit)
+            child_sid = bitboard.state_id(*child)
+            if not reachable[child_sid]:
+                reachable[child_sid] = True
+                stack.append(child)
+    return Solution(values, best, optimal, reachable)
+
+
+def perfect_policy(tie_break='random', seed=None, filename=PERFECT_POLICY_FILE):
+    """Policy of perfect play, loaded from filename (python solver.py) or solved now."""
+    if os.path.exists(filename):
+        best = np.load(filename)
+    else:
+        best = solve().best
+    return policy.Policy(best, tie_break, seed)
+
+
+# -----------------------------
+# ORACLE
+# -----------------------------
+def score_q_table(Q_table, purpose, solution=None):
+    """
+        Checking the moves of a Q-table against perfect play, in every reachable position where
+        the agent moves (X for attack, O for defence).
+
+        Returns:
+            dict: numbers of positions: "positions", "unknown" (state missing from the Q-table, random move),
+                  "optimal" (all moves with the highest Q value keep the result), "partly_optimal" (some of them do),
+                  "mistakes" (none of them does), and "optimal_ratio" = optimal / positions.
+        """
+    if purpose not in ('attack', 'defence'):
+        raise ValueError(f"Unknown purpose: {purpose}")
+    solution = solution or solve()
+    q_best = policy.compile_policy(Q_table)
+
+    counts = {"positions": 0, "unknown": 0, "optimal": 0, "partly_optimal": 0, "mistakes": 0}
+    for sid in np.flatnonzero(solution.reachable & (solution.best != 0)):
+        x_mask, o_mask = bitboard.from_state_id(int(sid))
+        x_moves = x_mask.bit_count() == o_mask.bit_count()
+        if x_moves != (purpose == 'attack'):
+            continue
+        counts["positions"] += 1
+        moves, optimal = int(q_best[sid]), int(solution.optimal[sid])
+        if not moves:
+            counts["unknown"] += 1
+        elif moves & ~optimal == 0:
+            counts["optimal"] += 1
+        elif moves & optimal:
+            counts["partly_optimal"] += 1
+        else:
+            counts["mistakes"] += 1
+    counts["optimal_ratio"] = counts["optimal"] / counts["positions"]
+    return counts
+
+
+if __name__ == "__main__":
+    # python solver.py [q_table_A_best.pkl q_table_D_best.pkl]
+    #   saves the perfect policy (perfect.policy.npy) and scores the Q-tables against it
+    from inference import load_model
+    start = time.perf_counter()
+    solution = solve()
+    print(f"Solved {int(solution.reachable.sum())} reachable positions in {time.perf_counter() - start:.2f} s, "
+          f"value of the empty board: {solution.values[0]}")
+    np.save(PERFECT_POLICY_FILE, solution.best)
+    print(f"Saved the perfect policy: {PERFECT_POLICY_FILE}")
+
+    for filename, purpose in zip(sys.argv[1:] or ["q_table_A_best.pkl", "q_table_D_best.pkl"], ("attack", "defence")):
+        Q_table = load_model(filename)
+        if Q_table is not None:
+            print(f"{filename} ({purpose}): {score_q_table(Q_table, purpose, solution)}")
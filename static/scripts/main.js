@@ -128,7 +128,45 @@ function makePlayerMove(row, col) {
     })
 }
 
+let combinedMoveAvailable = true; // false when the backend has no /player-and-ai-move endpoint
+
 function performAiGame(row, col) {
+    if (!gameActive) return;
+    if (!combinedMoveAvailable) return performAiGameTwoRequests(row, col);
+
+    // Player's move and AI's answer in one request
+    fetch("/player-and-ai-move", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ row: row, col: col })
+    })
+    .then(res => {
+        if (res.status === 404) {
+            combinedMoveAvailable = false;
+            return performAiGameTwoRequests(row, col);
+        }
+        return res.json().then(data => {
+            if (data.player) {
+                game.drawSymbol(row, col, data.player.current_player);
+                console.log("move made by:", data.player.current_player);
+                tryEndGame(data.player);
+            }
+            if (data.error) {
+                console.warn("Move error:", data.error);
+                alert(data.error || "An error occurred while moving");
+                return;
+            }
+            if (data.ai) {
+                console.log("move made by:", data.ai.current_player);
+                game.drawSymbol(data.ai.aiRow, data.ai.aiCol, data.ai.current_player);
+                tryEndGame(data.ai);
+            }
+        });
+    })
+    .catch(err => console.error("PvE error:", err));
+}
+
+function performAiGameTwoRequests(row, col) {
     makePlayerMove(row, col)
     .then(data => {
         if (!data || !gameActive) return;
@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import model
+import training_metrics
+from evaluation import exact_outcome
+
+# -----------------------------
+# HYPERPARAMETER SWEEP
+# -----------------------------
+# Trains and evaluates many configurations of model.train_agents in parallel worker processes.
+# Every configuration is passed to train_agents explicitly, the module globals of model.py are
+# only the defaults. Agents are scored by their exact results against a random opponent
+# (evaluation.exact_outcome), so configurations are compared without sampling noise.
+# The parent process appends one JSON line per finished configuration to the results file;
+# a configuration is identified by the hash of its parameters and trainer, so running the same spec again
+# skips the finished ones and continues an interrupted sweep.
+#   python sweep.py sweep.json --workers 8
+#
+# Spec (JSON), a grid:
+#   {"grid": {"learning_rate": [0.01, 0.1], "discount_factor": [0.8, 0.9]},
+#    "fixed": {"num_episodes": 100000}, "batched": true}
+# or a random search:
+#   {"random": {"learning_rate": {"log_uniform": [0.001, 0.5]}, "decay_rate": {"choice": [0.0001, 0.001]}},
+#    "samples": 20, "seed": 0, "fixed": {"num_episodes": 100000}, "batched": true}
+
+DEFAULT_RESULTS = 'sweep_results.jsonl'
+# n_step (None = one-step updates) is not in the defaults and None is left out of the id (see config_id)
+PARAMETERS = ('learning_rate', 'discount_factor', 'epsilon_min', 'epsilon_max', 'decay_rate', 'num_episodes', 'seed',
+              'n_step')
+INTEGER_PARAMETERS = ('num_episodes', 'seed', 'n_step')
+
+
+def default_parameters():
+    return {"learning_rate": model.learning_rate, "discount_factor": model.discount_factor,
+            "epsilon_min": model.epsilon_min, "epsilon_max": model.epsilon_max, "decay_rate": model.decay_rate,
+            "num_episodes": model.num_episodes, "seed": 0}
+
+
+def _check_names(names):
+    unknown = set(names) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+
+
+def _sample(name, distribution, rng):
+    if not isinstance(distribution, dict) or len(distribution) != 1:
+        raise ValueError(f"Distribution of {name} must be one of uniform, log_uniform, choice")
+    kind, args = next(iter(distribution.items()))
+    if kind == 'choice':
+        return rng.choice(args)
+    if kind == 'uniform':
+        value = rng.uniform(*args)
+    elif kind == 'log_uniform':
+        value = math.exp(rng.uniform(math.log(args[0]), math.log(args[1])))
+    else:
+        raise ValueError(f"Unknown distribution of {name}: {kind}")
+    return round(value) if name in INTEGER_PARAMETERS else value
+
+
+def configurations(spec):
+    """
+        Parameters of every configuration of the spec (defaults < "fixed" < grid or random values).
+        A random spec is sampled from its "seed", so the same spec always gives the same configurations.
+        """
+    fixed = spec.get("fixed", {})
+    _check_names(fixed)
+    base = {**default_parameters(), **fixed}
+    if "grid" in spec:
+        grid = spec["grid"]
+        _check_names(grid)
+        names = list(grid)
+        return [{**base, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+    if "random" in spec:
+        space = spec["random"]
+        _check_names(space)
+        rng = random.Random(spec.get("seed", 0))
+        return [{**base, **{name: _sample(name, distribution, rng) for name, distribution in space.items()}}
+                for _ in range(spec.get("samples", 10))]
+    raise ValueError("Spec needs a \"grid\" or a \"random\" search space")
+
+
+def config_id(parameters, batched=True):
+    # the trainer is part of the configuration; n_step None is the default one-step update, same as no n_step
+    payload = {**{name: value for name, value in parameters.items() if not (name == 'n_step' and value is None)},
+               "batched": batched}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+
+def run_configuration(parameters, batched=True):
+    """Training both agents with the given parameters and their exact results against a random opponent."""
+    start = time.perf_counter()
+    Q_attack, Q_defence = model.train_agents(
+        parameters["epsilon_min"], parameters["epsilon_max"], parameters["decay_rate"], batched=batched,
+        metrics_sink=training_metrics.RingBufferSink(), alpha=parameters["learning_rate"],
+        gamma=parameters["discount_factor"], episodes=parameters["num_episodes"], seed=parameters["seed"],
+        n_step=parameters.get("n_step"))
+    result = {"training_seconds": round(time.perf_counter() - start, 3)}
+    for purpose, Q_table in (("attack", Q_attack), ("defence", Q_defence)):
+        win, draw, loss = exact_outcome(purpose, Q_table)
+        result[purpose] = {"wins": win * 100, "draws": draw * 100, "losses": loss * 100}
+    return result
+
+
+# -----------------------------
+# RESULTS STORE
+# -----------------------------
+def append_result(filename, record):
+    # one write() of a whole line to a file opened with O_APPEND: lines of concurrent writers never mix
+    fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(record) + '\n').encode())
+    finally:
+        os.close(fd)
+
+
+def read_results(filename):
+    """Finished configurations: id -> record (a line cut off by a crash is ignored)."""
+    results = {}
+    if not os.path.exists(filename):
+        return results
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                results[record["id"]] = record
+    return results
+
+
+def rank(records):
+    # fewest losses first (summed over both agents), then the most wins
+    return sorted(records, key=lambda record: (record["attack"]["losses"] + record["defence"]["losses"],
+                                               -(record["attack"]["wins"] + record["defence"]["wins"])))
+
+
+def sweep(spec, results_file=DEFAULT_RESULTS, workers=None):
+    """
+        Running the configurations of the spec not found in results_file.
+
+        Returns:
+            list: records of all configurations of the spec finished so far, best first.
+        """
+    batched = spec.get("batched", True)
+    configs = {config_id(parameters, batched): parameters for parameters in configurations(spec)}
+    done = read_results(results_file)
+    pending = {cid: parameters for cid, parameters in configs.items() if cid not in done}
+    print(f"{len(configs)} configurations, {len(configs) - len(pending)} already finished, running {len(pending)}")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_configuration, parameters, batched): cid for cid, parameters in pending.items()}
+        for future in as_completed(futures):
+            cid = futures[future]
+            record = {"id": cid, "parameters": configs[cid], "batched": batched}
+            try:
+                record.update(future.result())
+            except Exception as e:
+                # failed configurations are recorded, but run again by the next sweep
+                record["error"] = str(e)
+                print(f"Configuration {cid} failed: {e}")
+            else:
+                done[cid] = record
+                print(f"{cid}: attack {record['attack']['wins']:.2f}% wins, defence "
+                      f"{record['defence']['losses']:.2f}% losses ({record['training_seconds']} s)")
+            append_result(results_file, record)
+
+    return rank([done[cid] for cid in configs if cid in done])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grid or random search over the training hyperparameters.")
+    parser.add_argument("spec", help="JSON file with the search space")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSONL file with the results, also used to resume")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (all cores by default)")
+    parser.add_argument("--top", type=int, default=5, help="number of best configurations printed at the end")
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    ranking = sweep(spec, args.results, args.workers)
+    print("--------------------------------------------------------------------")
+    for record in ranking[:args.top]:
+        print(f"{record['id']}: attack W/D/L {record['attack']['wins']:.2f}/{record['attack']['draws']:.2f}/"
+              f"{record['attack']['losses']:.2f}%, defence W/D/L {record['defence']['wins']:.2f}/"
+              f"{record['defence']['draws']:.2f}/{record['defence']['losses']:.2f}%  {json.dumps(record['parameters'])}")
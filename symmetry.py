@@ -0,0 +1,134 @@
+import pickle
+import sys
+import numpy as np
+import bitboard
+
+# -----------------------------
+# BOARD SYMMETRIES
+# -----------------------------
+# The 8 rotations/reflections of the board give equivalent positions. A canonical
+# Q-table keeps only one of them: the orientation with the lowest base-3 state id.
+# Transform t maps board b to board T(b) with T(b)[j] = b[PERMS[t][j]] (cells numbered
+# 0-8 like in bitboard.py), so a move on cell i of b is the move on cell INVERSE[t][i] of T(b).
+
+_COORDINATE_MAPS = (
+    lambda r, c: (r, c),            # identity
+    lambda r, c: (2 - c, r),        # rotation 90
+    lambda r, c: (2 - r, 2 - c),    # rotation 180
+    lambda r, c: (c, 2 - r),        # rotation 270
+    lambda r, c: (r, 2 - c),        # horizontal reflection
+    lambda r, c: (2 - r, c),        # vertical reflection
+    lambda r, c: (c, r),            # main diagonal reflection
+    lambda r, c: (2 - c, 2 - r)     # anti-diagonal reflection
+)
+PERMS = tuple(tuple(r * 3 + c for r, c in (f(*cell) for cell in bitboard.CELLS)) for f in _COORDINATE_MAPS)
+INVERSE = tuple(tuple(perm.index(i) for i in range(9)) for perm in PERMS)
+
+# transform -> mask -> transformed mask (and the mask transformed back)
+MASK_TRANSFORMS = tuple(tuple(sum(1 << j for j in range(9) if mask >> perm[j] & 1) for mask in range(512))
+                        for perm in PERMS)
+MASK_TRANSFORMS_INVERSE = tuple(tuple(sum(1 << j for j in range(9) if mask >> inverse[j] & 1) for mask in range(512))
+                                for inverse in INVERSE)
+
+
+def _canonical_ids():
+    # base-3 digits of all states, then ids of all 8 transformed boards at once
+    digits = (np.arange(bitboard.NUM_STATES)[:, None] // 3 ** np.arange(9)) % 3
+    transformed = np.stack([digits[:, list(perm)] @ 3 ** np.arange(9) for perm in PERMS])
+    return transformed.min(axis=0), transformed.argmin(axis=0)
+
+# state id -> id of the canonical state, state id -> transform giving the canonical state;
+# built on first use, so the server does not pay for them when its Q-tables are not canonical
+_canonical_tables = None
+
+def canonical_tables():
+    global _canonical_tables
+    if _canonical_tables is None:
+        ids, transforms = _canonical_ids()
+        _canonical_tables = tuple(ids.tolist()), tuple(transforms.tolist())
+    return _canonical_tables
+
+
+def is_canonical(Q_table):
+    return getattr(Q_table, 'canonical', False)
+
+def canonical(x_mask, o_mask):
+    """Returning (x_mask, o_mask, transform) of the canonical orientation of the board."""
+    t = canonical_tables()[1][bitboard.state_id(x_mask, o_mask)]
+    return MASK_TRANSFORMS[t][x_mask], MASK_TRANSFORMS[t][o_mask], t
+
+def canonical_key(state):
+    """Returning (canonical state string, transform) for a Q-table key."""
+    x_mask, o_mask = bitboard.from_key(state)
+    sid = bitboard.state_id(x_mask, o_mask)
+    canonical_ids, transforms = canonical_tables()
+    return bitboard.STATE_KEYS[canonical_ids[sid]], transforms[sid]
+
+def to_canonical_action(action, t):
+    cell = INVERSE[t][action[0] * 3 + action[1]]
+    return divmod(cell, 3)
+
+def from_canonical_action(action, t):
+    cell = PERMS[t][action[0] * 3 + action[1]]
+    return divmod(cell, 3)
+
+def to_canonical_q(q_values, t):
+    return np.asarray(q_values).reshape(9)[list(PERMS[t])].reshape(3, 3)
+
+def from_canonical_q(q_values, t):
+    return np.asarray(q_values).reshape(9)[list(INVERSE[t])].reshape(3, 3)
+
+
+class SymmetricQTable(dict):
+    """Dict Q-table keyed by canonical states, Q values stored in the canonical orientation."""
+    canonical = True
+
+
+def lookup(Q_table, x_mask, o_mask):
+    """Q values (3x3, in the orientation of the given board) or None if the state is unknown."""
+    if is_canonical(Q_table):
+        cx_mask, co_mask, t = canonical(x_mask, o_mask)
+        q_values = Q_table.get(bitboard.state_key(cx_mask, co_mask))
+        return None if q_values is None else from_canonical_q(q_values, t)
+    return Q_table.get(bitboard.state_key(x_mask, o_mask))
+
+
+def expand(Q_table):
+    """Generator of (state, Q values) for every orientation of every state of a canonical Q-table."""
+    for state, q_values in Q_table.items():
+        x_mask, o_mask = bitboard.from_key(state)
+        seen = set()
+        for t in range(8):
+            # board b with T_t(b) = canonical board
+            raw = (MASK_TRANSFORMS_INVERSE[t][x_mask], MASK_TRANSFORMS_INVERSE[t][o_mask])
+            if raw in seen:
+                continue
+            seen.add(raw)
+            yield bitboard.state_key(*raw), from_canonical_q(q_values, t)
+
+
+def fold_table(Q_table):
+    """Folding a raw Q-table into a canonical one, Q values of symmetric states are averaged."""
+    sums, counts = {}, {}
+    for state, q_values in Q_table.items():
+        key, t = canonical_key(state)
+        sums[key] = sums.get(key, 0) + to_canonical_q(q_values, t)
+        counts[key] = counts.get(key, 0) + 1
+
+    folded = SymmetricQTable()
+    for key, total in sums.items():
+        folded[key] = total / counts[key]
+    return folded
+
+
+if __name__ == "__main__":
+    # python symmetry.py q_table_A_best.pkl -> q_table_A_best_canonical.pkl
+    from symmetry import fold_table     # pickled class has to come from the importable module, not __main__
+    for filename in sys.argv[1:] or ["q_table_A_best.pkl", "q_table_D_best.pkl"]:
+        with open(filename, 'rb') as f:
+            Q_table = pickle.load(f)
+        folded = fold_table(Q_table)
+        output = filename[:-len('.pkl')] + '_canonical.pkl'
+        with open(output, 'wb') as f:
+            pickle.dump(folded, f)
+        print(f"Folded {len(Q_table)} states of {filename} into {len(folded)} canonical states: {output}")
@@ -0,0 +1,70 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)      # the server loads its models from the repository directory
+
+import history
+import app as server
+
+
+@pytest.fixture
+def empty_store(tmp_path):
+    # JSONL store whose file does not exist yet, as on a fresh install before the first finished game
+    writer = history.create_writer('jsonl', str(tmp_path / 'games_history.jsonl'), background=False)
+    previous = history.get_writer()
+    history.set_writer(writer)
+    yield writer
+    history.set_writer(previous)
+
+
+def test_empty_store_has_no_games(empty_store):
+    assert empty_store.query() == (0, [])
+    assert list(empty_store.export()) == []
+
+
+def test_history_pages_of_empty_store(empty_store):
+    client = server.app.test_client()
+    assert client.get('/history').status_code == 200
+    response = client.get('/api/history')
+    assert response.status_code == 200
+    assert response.get_json()["total"] == 0 and response.get_json()["games"] == []
+    response = client.get('/api/history/export')
+    assert response.status_code == 200 and response.data == b''
+
+
+def test_background_writer_writes_queued_games_on_close(tmp_path):
+    filename = str(tmp_path / 'games_history.jsonl')
+    writer = history.create_writer('jsonl', filename, background=True)
+    games = [{"moves": [0, 3, 1, 4, 2], "winner": "X", "strategy": "attack"} for _ in range(50)]
+    for game in games:
+        writer.append(game)
+    writer.close()      # what the atexit hook of get_writer does on shutdown
+
+    assert writer.stats()["written"] == len(games) and writer.stats()["queue_depth"] == 0
+    stored = history.create_writer('jsonl', filename, background=False)
+    assert stored.query(limit=100)[0] == len(games)
+    assert [game["moves"] for game in stored.export()] == [game["moves"] for game in games]
+
+    # a game finished during shutdown is written at once
+    writer.append(games[0])
+    assert stored.query()[0] == len(games) + 1
+
+
+def test_pages_without_filters_and_unindexed_lines(tmp_path):
+    filename = str(tmp_path / 'games_history.jsonl')
+    writer = history.create_writer('jsonl', filename, background=False)
+    for strategy in ('attack', 'defence') * 10:
+        writer.append({"moves": [0, 3, 1, 4, 2], "result": "X", "strategy": strategy})
+    # lines written without their index entries, e.g. by a process killed in between
+    with open(filename, 'a') as f:
+        f.write('{"moves": [4], "result": "O", "strategy": "attack"}\n' * 2)
+
+    total, page = writer.query(offset=1, limit=3)
+    assert total == 22 and [game['id'] for game in page] == [21, 20, 19]
+    assert writer.query(offset=21, limit=5)[1][0]['id'] == 1 and writer.query(offset=22)[1] == []
+    assert [game['id'] for game in writer.export(after_id=19)] == [20, 21, 22]
+    total, page = writer.query(strategy='attack', limit=2)
+    assert total == 12 and [game['id'] for game in page] == [22, 21]
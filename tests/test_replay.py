@@ -0,0 +1,58 @@
+import os
+import sys
+import pickle
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bitboard
+import history
+import replay
+
+
+def sid(*cells_by_player):
+    x_cells, o_cells = cells_by_player
+    return bitboard.state_id(sum(1 << c for c in x_cells), sum(1 << c for c in o_cells))
+
+
+def test_transitions_of_a_won_game():
+    # X: 0, 1, 2 wins the top row, O: 3, 4
+    transitions = list(replay.game_transitions({"id": 1, "moves": [0, 3, 1, 4, 2]}))
+    assert transitions[:4] == [
+        ('X', sid([], []), 0, sid([0], []), -0.5),
+        ('O', sid([0], []), 3, sid([0], [3]), 0.0),
+        ('X', sid([0], [3]), 1, sid([0, 1], [3]), -0.5),
+        ('O', sid([0, 1], [3]), 4, sid([0, 1], [3, 4]), 0.0),
+    ]
+    # final rewards of the last moves of both players
+    assert transitions[4:] == [
+        ('X', sid([0, 1], [3, 4]), 2, sid([0, 1, 2], [3, 4]), 1),
+        ('O', sid([0, 1], [3]), 4, sid([0, 1], [3, 4]), -1),
+    ]
+
+
+def test_old_move_log_format():
+    moves = [{"player": "X", "position": [0, 0]}, {"player": "O", "position": [1, 0]}]
+    assert [t[2] for t in replay.game_transitions({"moves": moves})] == [0, 3]
+
+
+@pytest.mark.parametrize("moves", [[0, 3, 1, 4, 2, 5], [0, 0], [0, 9]])
+def test_malformed_game_raises(moves):
+    with pytest.raises(ValueError):
+        list(replay.game_transitions({"id": 1, "moves": moves}))
+
+
+def test_malformed_game_is_skipped_without_training(tmp_path):
+    writer = history.create_writer('jsonl', str(tmp_path / 'games.jsonl'), background=False)
+    # moves after the end of the game: the first transitions are valid, the game is not
+    writer.append({"moves": [0, 3, 1, 4, 2, 5], "winner": "X", "strategy": "defence"})
+    writer.flush()
+
+    out = {name: str(tmp_path / f"{name}.pkl") for name in ("attack", "defence")}
+    checkpoint = replay.replay(writer, attack=str(tmp_path / 'missing_A.pkl'), defence=str(tmp_path / 'missing_D.pkl'),
+                               attack_out=out["attack"], defence_out=out["defence"],
+                               checkpoint_file=str(tmp_path / 'checkpoint.json'))
+    assert checkpoint["games"] == 0 and checkpoint["skipped"] == 1 and checkpoint["transitions"] == 0
+    for filename in out.values():
+        with open(filename, 'rb') as f:
+            assert pickle.load(f) == {}
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sessions
+from game import Game
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # both clocks used by the stores, moved forward by the test
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path, clock):
+    if request.param == 'memory':
+        store = sessions.MemorySessionStore(max_size=2, idle_ttl=60)
+    else:
+        store = sessions.SQLiteSessionStore(str(tmp_path / 'sessions.sqlite3'), max_size=2, idle_ttl=60)
+    return store
+
+
+def test_least_recently_used_game_is_evicted(store, clock):
+    store.save('a', Game())
+    clock[0] += 1
+    store.save('b', Game())
+    clock[0] += 1
+    assert store.get('a') is not None     # 'a' is now used more recently than 'b'
+    clock[0] += 1
+    store.save('c', Game())
+
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+    assert len(store) == 2 and store.evictions == 1
+
+
+def test_idle_game_expires(store, clock):
+    store.save('a', Game())
+    store.save('b', Game())
+    clock[0] += 59
+    assert store.get('a') is not None     # using a game keeps it alive
+    clock[0] += 59
+    assert store.get('a') is not None
+    assert store.get('b') is None
+    assert store.expirations == 1
+
+
+def test_saved_game_is_returned(store):
+    game = Game()
+    game.make_move(1, 1)
+    store.save('a', game)
+    assert store.get('a').board == game.board
+    store.delete('a')
+    assert store.get('a') is None and len(store) == 0
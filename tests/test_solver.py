@@ -0,0 +1,53 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bitboard
+import solver
+
+
+@pytest.fixture(scope='module')
+def solution():
+    return solver.solve()
+
+
+def worst_result(solution, x_mask, o_mask, perfect):
+    """Worst result for the perfect player ('X' or 'O') over every best move it may play and every opponent answer."""
+    finished, winner = bitboard.game_result(x_mask, o_mask)
+    if finished:
+        return 0 if winner == 'draw' else 1 if winner == perfect else -1
+    x_to_move = x_mask.bit_count() == o_mask.bit_count()
+    if x_to_move == (perfect == 'X'):
+        best = int(solution.best[bitboard.state_id(x_mask, o_mask)])
+        moves = [1 << i for i in range(9) if best >> i & 1]
+        assert moves, "no best move in an unfinished position"
+    else:
+        moves = solver.FREE_BITS[x_mask | o_mask]
+    return min(worst_result(solution, x_mask | bit, o_mask, perfect) if x_to_move
+               else worst_result(solution, x_mask, o_mask | bit, perfect) for bit in moves)
+
+
+@pytest.mark.parametrize('perfect', ['X', 'O'])
+def test_perfect_play_never_loses(solution, perfect):
+    assert worst_result(solution, 0, 0, perfect) == 0
+
+
+def test_empty_board_is_a_draw(solution):
+    assert solver.score(0, 0) == 0
+    assert solution.values[0] == 0
+    assert solution.reachable.sum() == 5478
+
+
+def test_takes_the_win(solution):
+    # X: 0, 1, O: 3, 4, X wins with 2 at once (score = 1 + 4 empty cells left)
+    x_mask, o_mask = 0b11, 0b11000
+    assert solver.score(x_mask, o_mask) == 5
+    assert solution.best[bitboard.state_id(x_mask, o_mask)] == 1 << 2
+
+
+def test_blocks_the_loss(solution):
+    # X: 0, 1, O: 4, O has to block the top row
+    x_mask, o_mask = 0b11, 1 << 4
+    assert solution.best[bitboard.state_id(x_mask, o_mask)] == 1 << 2
@@ -0,0 +1,59 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bitboard
+import symmetry
+
+# X: 0, 5, O: 1 - a position without any symmetry of its own, so all 8 orientations differ
+X_MASK, O_MASK = 1 << 0 | 1 << 5, 1 << 1
+
+
+@pytest.mark.parametrize('t', range(8))
+def test_mask_transform_round_trip(t):
+    for mask in range(512):
+        assert symmetry.MASK_TRANSFORMS_INVERSE[t][symmetry.MASK_TRANSFORMS[t][mask]] == mask
+
+
+@pytest.mark.parametrize('t', range(8))
+def test_action_and_q_round_trip(t):
+    for cell in bitboard.CELLS:
+        assert symmetry.from_canonical_action(symmetry.to_canonical_action(cell, t), t) == cell
+    q_values = np.arange(9, dtype=float).reshape(3, 3)
+    assert np.array_equal(symmetry.from_canonical_q(symmetry.to_canonical_q(q_values, t), t), q_values)
+
+
+def test_canonical_is_the_same_for_all_orientations():
+    orientations = {(symmetry.MASK_TRANSFORMS[t][X_MASK], symmetry.MASK_TRANSFORMS[t][O_MASK]) for t in range(8)}
+    assert len(orientations) == 8
+    canonical = {symmetry.canonical(x_mask, o_mask)[:2] for x_mask, o_mask in orientations}
+    assert len(canonical) == 1
+
+
+def test_canonical_and_back():
+    cx_mask, co_mask, t = symmetry.canonical(X_MASK, O_MASK)
+    assert (symmetry.MASK_TRANSFORMS_INVERSE[t][cx_mask], symmetry.MASK_TRANSFORMS_INVERSE[t][co_mask]) == (X_MASK, O_MASK)
+    # a move on the board is the same move on the canonical board
+    for i, cell in enumerate(bitboard.CELLS):
+        row, col = symmetry.to_canonical_action(cell, t)
+        assert symmetry.MASK_TRANSFORMS[t][1 << i] == bitboard.cell_bit(row, col)
+
+
+def test_fold_and_expand_round_trip():
+    # Q values of every orientation of the position, consistent with each other
+    q_values = np.arange(9, dtype=float).reshape(3, 3)
+    cx_mask, co_mask, t = symmetry.canonical(X_MASK, O_MASK)
+    canonical_q = symmetry.to_canonical_q(q_values, t)
+    table = symmetry.SymmetricQTable({bitboard.state_key(cx_mask, co_mask): canonical_q})
+
+    expanded = dict(symmetry.expand(table))
+    assert len(expanded) == 8
+    assert np.array_equal(expanded[bitboard.state_key(X_MASK, O_MASK)], q_values)
+    assert np.array_equal(symmetry.lookup(table, X_MASK, O_MASK), q_values)
+
+    folded = symmetry.fold_table(expanded)
+    assert list(folded) == list(table)
+    assert np.allclose(folded[bitboard.state_key(cx_mask, co_mask)], canonical_q)
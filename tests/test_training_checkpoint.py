@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model
+import training_metrics
+
+EPISODES = 2000
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptingSink(training_metrics.RingBufferSink):
+    """Sink stopping the training at the given checkpoint, like a run killed in the middle."""
+    def __init__(self, stop_after):
+        super().__init__()
+        self.stop_after = stop_after
+
+    def write(self, record):
+        if len(self.records) == self.stop_after:
+            raise Interrupted
+        super().write(record)
+
+
+def train(batched, checkpoint_file=None, resume=False, metrics_sink=None):
+    return model.train_agents(model.epsilon_min, model.epsilon_max, model.decay_rate, batched=batched,
+                              batch_size=64, metrics_sink=metrics_sink, episodes=EPISODES, seed=7,
+                              checkpoint_file=checkpoint_file, resume=resume)
+
+
+def assert_same_tables(tables, expected):
+    for Q_table, expected_table in zip(tables, expected):
+        assert Q_table.keys() == expected_table.keys()
+        for state, q_values in expected_table.items():
+            assert np.array_equal(np.asarray(Q_table[state]), np.asarray(q_values)), state
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_resume_gives_the_same_tables(tmp_path, batched):
+    expected = train(batched)
+
+    checkpoint_file = str(tmp_path / 'checkpoint.pkl')
+    with pytest.raises(Interrupted):
+        train(batched, checkpoint_file, metrics_sink=InterruptingSink(stop_after=4))
+    assert os.path.exists(checkpoint_file) and not os.path.exists(checkpoint_file + '.tmp')
+
+    assert_same_tables(train(batched, checkpoint_file, resume=True), expected)
+
+
+def test_resume_with_other_settings_fails(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.pkl')
+    with pytest.raises(Interrupted):
+        train(False, checkpoint_file, metrics_sink=InterruptingSink(stop_after=2))
+    with pytest.raises(ValueError):
+        train(True, checkpoint_file, resume=True)
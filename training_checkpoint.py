@@ -0,0 +1,88 @@
+import os
+import pickle
+import random
+import numpy as np
+import symmetry
+
+# -----------------------------
+# TRAINING CHECKPOINTS
+# -----------------------------
+# train_agents(..., checkpoint_file=...) saves a snapshot at every evaluation checkpoint
+# (every tenth of the run) and at the end. A snapshot holds everything the rest of the run
+# depends on: both Q-tables (or the arrays of the batched trainer), the next episode - which is
+# also the position in the epsilon schedule - and the state of the random generators. Snapshots
+# are written to a temporary file and renamed, so a run killed at any moment leaves the previous
+# snapshot intact. train_agents(..., resume=True) continues from the snapshot exactly as if
+# the run had not been interrupted.
+
+FORMAT_VERSION = 1
+DEFAULT_CHECKPOINT = 'training_checkpoint.pkl'
+
+# training settings a snapshot can only be resumed with
+CONFIG_KEYS = ('epsilon_min', 'epsilon_max', 'decay_rate', 'alpha', 'gamma', 'episodes', 'symmetric', 'batched',
+               'batch_size', 'n_step')
+
+
+def save_atomic(filename, write):
+    # writing to a temporary file and renaming it, so a crash never leaves a half-written file
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, filename)
+
+
+def save_snapshot(filename, config, episode, tables=None, trainer=None):
+    """
+        Saving a snapshot taken before playing episode (all earlier episodes are in the tables).
+
+        Args:
+            config (dict): training settings (CONFIG_KEYS).
+            tables (tuple): (Q_attack, Q_defence) of the per-episode training.
+            trainer (batch_training.BatchTrainer): state of the batched training instead of tables.
+        """
+    snapshot = {"format": FORMAT_VERSION, "config": config, "episode": episode}
+    if trainer is not None:
+        snapshot["trainer"] = trainer.get_state()
+    else:
+        snapshot["tables"] = tables
+        snapshot["random_state"] = random.getstate()
+        snapshot["numpy_state"] = np.random.get_state()
+    save_atomic(filename, lambda f: pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def load_snapshot(filename, config):
+    """
+        Snapshot saved in filename or None if there is none. A snapshot of a run with other
+        settings raises ValueError, it cannot be continued with these.
+        """
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'rb') as f:
+        snapshot = pickle.load(f)
+    if snapshot.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unknown format of the training checkpoint {filename}")
+    different = [key for key in CONFIG_KEYS if snapshot["config"].get(key) != config.get(key)]
+    if different:
+        raise ValueError(f"Training checkpoint {filename} was saved with other settings: {', '.join(different)}")
+    return snapshot
+
+
+def restore_random_state(snapshot):
+    random.setstate(snapshot["random_state"])
+    np.random.set_state(snapshot["numpy_state"])
+
+
+def warm_start_table(Q_table, symmetric=False):
+    """
+        Trainable copy of a saved Q-table (dict, canonical or dense): a dict of 3x3 float arrays,
+        folded into a canonical table for symmetric training. The saved table is not changed.
+        """
+    if symmetric and symmetry.is_canonical(Q_table):
+        return symmetry.SymmetricQTable({state: np.array(q_values, dtype=float).reshape(3, 3)
+                                         for state, q_values in Q_table.items()})
+    if symmetric:
+        return symmetry.fold_table(Q_table)
+    items = symmetry.expand(Q_table) if symmetry.is_canonical(Q_table) else Q_table.items()
+    return {state: np.array(q_values, dtype=float).reshape(3, 3) for state, q_values in items}
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+from collections import deque
+
+# -----------------------------
+# TRAINING METRICS SINKS
+# -----------------------------
+# train_agents sends one record per checkpoint to a sink instead of drawing plots:
+#   {"episode": 50000, "attack": {"wins": 85.1, "draws": 9.2, "losses": 5.7}, "defence": {...}}
+# (results in % of evaluation games). Plots are made later from the file by plot_training.py.
+
+AGENTS = ('attack', 'defence')
+RESULTS = ('wins', 'draws', 'losses')
+
+
+class MetricsSink:
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonlMetricsSink(MetricsSink):
+    def __init__(self, filename='training_metrics.jsonl', append=False):
+        self.filename = filename
+        self._file = open(filename, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()      # readable while training is still running
+
+    def close(self):
+        self._file.close()
+
+
+class CsvMetricsSink(MetricsSink):
+    # flat columns: episode, attack_wins, attack_draws, ..., defence_losses
+    COLUMNS = ['episode'] + [f"{agent}_{result}" for agent in AGENTS for result in RESULTS]
+
+    def __init__(self, filename='training_metrics.csv', append=False):
+        self.filename = filename
+        write_header = not append or not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self._file = open(filename, 'a' if append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if write_header:
+            self._writer.writerow(self.COLUMNS)
+
+    def write(self, record):
+        self._writer.writerow([record['episode']] + [record[agent][result] for agent in AGENTS for result in RESULTS])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class RingBufferSink(MetricsSink):
+    """Keeping the last `size` records in memory (e.g. for tests or a notebook)."""
+    def __init__(self, size=1000):
+        self.records = deque(maxlen=size)
+
+    def write(self, record):
+        self.records.append(record)
+
+
+def create_sink(filename):
+    # sink chosen by file extension
+    if filename.endswith('.csv'):
+        return CsvMetricsSink(filename)
+    return JsonlMetricsSink(filename)
+
+
+def read_metrics(filename='training_metrics.jsonl'):
+    """Reading records written by JsonlMetricsSink or CsvMetricsSink."""
+    records = []
+    with open(filename, 'r', newline='', encoding='utf-8') as f:
+        if filename.endswith('.csv'):
+            for row in csv.DictReader(f):
+                record = {'episode': int(row['episode'])}
+                for agent in AGENTS:
+                    record[agent] = {result: float(row[f"{agent}_{result}"]) for result in RESULTS}
+                records.append(record)
+        else:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    return records